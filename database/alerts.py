@@ -0,0 +1,86 @@
+from collections import namedtuple
+from datetime import date, timedelta
+
+from database.connection import get_connection
+
+# Sévérités, de la plus grave à la moins grave
+SEVERITY_CRITICAL = "critical"  # échéance dépassée
+SEVERITY_WARNING = "warning"    # échéance dans l'horizon configuré
+
+# Une règle surveille une colonne de date : dépassée -> critical,
+# dans les _horizons[name] prochains jours -> warning.
+AlertRule = namedtuple("AlertRule", "name column overdue_type upcoming_type")
+
+# Alerte renvoyée par le moteur. entity vaut "vehicle" ou "driver", entity_id
+# est l'id correspondant, label l'immatriculation ou "Nom Prénom", days_left
+# le nombre de jours avant l'échéance (négatif si dépassée).
+Alert = namedtuple("Alert", "rule severity type entity entity_id label date days_left")
+
+VEHICLE_RULES = (
+    AlertRule("vehicle_revision", "revision_date", "Révision dépassée", "Révision à prévoir"),
+    AlertRule("vehicle_control", "control_date", "Contrôle technique dépassé", "Contrôle technique à prévoir"),
+)
+DRIVER_RULES = (
+    AlertRule("driver_license", "expiry_date", "Permis expiré", "Permis expire bientôt"),
+)
+
+# Horizon d'alerte en jours, par règle
+DEFAULT_HORIZONS = {"vehicle_revision": 30, "vehicle_control": 30, "driver_license": 30}
+_horizons = dict(DEFAULT_HORIZONS)
+
+def configure(horizons):
+    """Remplace les horizons d'alerte (en jours) des règles données."""
+    unknown = set(horizons) - set(DEFAULT_HORIZONS)
+    if unknown:
+        raise ValueError(f"Règles d'alerte inconnues : {', '.join(sorted(unknown))}")
+    for name, days in horizons.items():
+        if not isinstance(days, int) or days < 0:
+            raise ValueError(f"Horizon invalide pour {name} : {days}")
+    _horizons.update(horizons)
+
+def _evaluate(db_file, entity, table, label_sql, rules, horizons, today):
+    # Une seule requête par table : chaque règle est une plage sur l'index de
+    # sa colonne de date (<= aujourd'hui + horizon), réunies par UNION ALL.
+    # Une échéance dépassée ne produit donc qu'une seule alerte.
+    selects = []
+    params = []
+    for index, rule in enumerate(rules):
+        selects.append(f"SELECT {index}, id, {label_sql}, {rule.column} FROM {table} "
+                       f"WHERE {rule.column} IS NOT NULL AND {rule.column} <= ?")
+        params.append((today + timedelta(days=horizons[rule.name])).isoformat())
+    cursor = get_connection(db_file).cursor()
+    cursor.execute(" UNION ALL ".join(selects) + " ORDER BY 4", params)
+
+    today_str = today.isoformat()
+    alerts = []
+    for index, entity_id, label, due_date in cursor.fetchall():
+        rule = rules[index]
+        overdue = due_date < today_str
+        try:
+            days_left = (date.fromisoformat(due_date) - today).days
+        except ValueError:
+            days_left = None
+        alerts.append(Alert(rule.name,
+                            SEVERITY_CRITICAL if overdue else SEVERITY_WARNING,
+                            rule.overdue_type if overdue else rule.upcoming_type,
+                            entity, entity_id, label, due_date, days_left))
+    return alerts
+
+def _horizons_for(horizons):
+    if horizons is None:
+        return _horizons
+    return dict(_horizons, **horizons)
+
+def vehicle_alerts(db_file, horizons=None, today=None):
+    return _evaluate(db_file, "vehicle", "vehicles", "registration", VEHICLE_RULES,
+                     _horizons_for(horizons), today or date.today())
+
+def driver_alerts(db_file, horizons=None, today=None):
+    return _evaluate(db_file, "driver", "drivers", "name || ' ' || surname", DRIVER_RULES,
+                     _horizons_for(horizons), today or date.today())
+
+def collect_alerts(db_file, horizons=None, today=None):
+    """Toutes les alertes, les échéances dépassées d'abord puis par date."""
+    alerts = vehicle_alerts(db_file, horizons, today) + driver_alerts(db_file, horizons, today)
+    alerts.sort(key=lambda alert: (alert.severity != SEVERITY_CRITICAL, alert.date))
+    return alerts
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Une connexion par (fichier de base, thread) : chaque thread réutilise la sienne
+# au lieu d'ouvrir une nouvelle connexion à chaque appel de db_utils.
+_connections = {}
+# Connexions de threads encore actifs à rouvrir par leur propriétaire
+# (voir close_all_connections)
+_stale = set()
+_lock = threading.Lock()
+
+# PRAGMA appliqués à chaque nouvelle connexion, dans cet ordre.
+# journal_mode vient en premier car il conditionne le coût de synchronous.
+PRAGMA_ORDER = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "foreign_keys")
+_settings = {}
+
+def configure(settings):
+    """Définit le profil de performance appliqué aux prochaines connexions."""
+    unknown = set(settings) - set(PRAGMA_ORDER)
+    if unknown:
+        raise ValueError(f"Paramètres SQLite inconnus : {', '.join(sorted(unknown))}")
+    _settings.clear()
+    _settings.update(settings)
+
+def _apply_settings(conn):
+    for name in PRAGMA_ORDER:
+        if name not in _settings:
+            continue
+        value = _settings[name]
+        if isinstance(value, bool):
+            value = "ON" if value else "OFF"
+        elif not isinstance(value, int):
+            value = str(value).upper()
+            if not value.isalnum():
+                raise ValueError(f"Valeur invalide pour PRAGMA {name} : {value}")
+        conn.execute(f"PRAGMA {name} = {value}")
+
+def get_connection(db_file):
+    key = (db_file, threading.get_ident())
+    with _lock:
+        conn = _connections.get(key)
+        if conn is not None and key in _stale:
+            _stale.discard(key)
+            del _connections[key]
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Erreur lors de la fermeture de la connexion : {e}")
+            conn = None
+        if conn is None:
+            # check_same_thread=False uniquement pour permettre la fermeture
+            # depuis le thread principal à l'arrêt de l'application.
+            conn = sqlite3.connect(db_file, check_same_thread=False)
+            _apply_settings(conn)
+            _connections[key] = conn
+            logger.debug(f"Nouvelle connexion ouverte vers {db_file}")
+    return conn
+
+def close_connection(db_file):
+    """Ferme la connexion du thread courant vers db_file, si elle existe."""
+    key = (db_file, threading.get_ident())
+    with _lock:
+        conn = _connections.pop(key, None)
+        _stale.discard(key)
+    if conn is not None:
+        conn.close()
+
+def close_all_connections(db_file=None):
+    """Ferme les connexions ouvertes (ou seulement celles vers db_file).
+
+    Seules les connexions du thread courant et des threads terminés sont
+    fermées ici : celle d'un thread encore actif peut être en cours
+    d'utilisation. Elle est marquée et ce thread la ferme puis en rouvre
+    une à son prochain get_connection().
+    """
+    current = threading.get_ident()
+    alive = {thread.ident for thread in threading.enumerate()}
+    with _lock:
+        keys = [key for key in _connections if db_file is None or key[0] == db_file]
+        closable = [key for key in keys if key[1] == current or key[1] not in alive]
+        _stale.update(set(keys) - set(closable))
+        _stale.difference_update(closable)
+        conns = [_connections.pop(key) for key in closable]
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la fermeture de la connexion : {e}")
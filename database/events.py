@@ -0,0 +1,44 @@
+import threading
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Bus des modifications : chaque écriture de db_utils publie un ChangeEvent
+# après son commit. entity vaut "vehicle", "driver", "expense", "mission" ou
+# "assignment" ; entity_id est None pour un ajout en masse.
+ChangeEvent = namedtuple("ChangeEvent", "entity entity_id operation")
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_subscribers = []  # (callback, entités suivies ou None pour toutes)
+_lock = threading.Lock()
+
+def subscribe(callback, entities=None):
+    """Appelle callback(event) à chaque modification des entités données (toutes par défaut).
+
+    callback est appelé dans le thread qui a fait la modification, qui peut
+    être un thread de travail : un abonné Tk doit repasser par le thread
+    principal avant de toucher à ses widgets.
+    """
+    with _lock:
+        _subscribers.append((callback, frozenset(entities) if entities else None))
+
+def unsubscribe(callback):
+    with _lock:
+        _subscribers[:] = [entry for entry in _subscribers if entry[0] != callback]
+
+def publish(entity, entity_id, operation):
+    event = ChangeEvent(entity, entity_id, operation)
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback, entities in subscribers:
+        if entities is not None and entity not in entities:
+            continue
+        try:
+            callback(event)
+        except Exception as e:
+            # Un abonné défaillant ne doit pas faire échouer l'écriture déjà validée
+            logger.error(f"Erreur dans un abonné aux modifications ({event}) : {e}")
@@ -0,0 +1,110 @@
+"""Commandes de maintenance de la base, hors interface graphique.
+
+    python -m database.maintenance verify-aggregates [--db fleet_data.db]
+    python -m database.maintenance rebuild-aggregates [--db fleet_data.db]
+    python -m database.maintenance verify-missions [--db fleet_data.db] [--holidays FR]
+    python -m database.maintenance recompute-missions [--db fleet_data.db] [--holidays FR]
+    python -m database.maintenance rebuild-fuel [--db fleet_data.db]
+    python -m database.maintenance fuel-outliers [--db fleet_data.db]
+    python -m database.maintenance verify-foreign-keys [--db fleet_data.db]
+
+--holidays choisit le calendrier de jours fériés (utils/holiday_data) pris
+en compte dans les week-ends des missions ; "aucun" pour l'ignorer.
+"""
+import argparse
+import sys
+
+import db_utils as root_database
+from utils import holidays
+
+DEFAULT_DATABASE_FILE = "fleet_data.db"
+DEFAULT_HOLIDAY_CALENDAR = "FR"
+NO_HOLIDAY_CALENDAR = "aucun"
+
+def verify_aggregates(db_file):
+    mismatches = root_database.verify_expense_aggregates(db_file)
+    for table, key, found, wanted in mismatches:
+        print(f"{table} [{key}] : stocké total={found[0]:.2f} nombre={found[1]}, "
+              f"attendu total={wanted[0]:.2f} nombre={wanted[1]}")
+    if mismatches:
+        print(f"{len(mismatches)} écart(s) trouvé(s). Lancer rebuild-aggregates pour corriger.")
+        return 1
+    print("Agrégats des dépenses cohérents.")
+    return 0
+
+def rebuild_aggregates(db_file):
+    root_database.rebuild_expense_aggregates(db_file)
+    print("Agrégats des dépenses recalculés.")
+    return 0
+
+def _print_mission_changes(changes):
+    for mission_id, found, wanted in changes:
+        print(f"mission {mission_id} : stocké durée={found[0]} nuitées={found[1]} week-ends={found[2]}, "
+              f"attendu durée={wanted[0]} nuitées={wanted[1]} week-ends={wanted[2]}")
+
+def verify_missions(db_file):
+    changes = root_database.recompute_mission_days(db_file, dry_run=True, calendar=holidays.get_calendar())
+    _print_mission_changes(changes)
+    if changes:
+        print(f"{len(changes)} mission(s) à corriger. Lancer recompute-missions pour corriger.")
+        return 1
+    print("Durées, nuitées et week-ends des missions cohérents.")
+    return 0
+
+def recompute_missions(db_file):
+    changes = root_database.recompute_mission_days(db_file, calendar=holidays.get_calendar())
+    _print_mission_changes(changes)
+    print(f"{len(changes)} mission(s) mise(s) à jour.")
+    return 0
+
+def rebuild_fuel(db_file):
+    count = root_database.rebuild_fuel_consumption(db_file)
+    print(f"Consommation de carburant recalculée pour {count} plein(s).")
+    return 0
+
+def fuel_outliers(db_file):
+    # Pleins écartés du calcul de consommation (le premier plein de chaque
+    # véhicule n'est pas une anomalie)
+    outliers = [row for row in root_database.list_fuel_consumption(db_file, flagged_only=True)
+                if row[9] != root_database.FUEL_FLAG_FIRST]
+    for expense_id, registration, date, mileage, liters, amount, distance, consumption, cost_per_km, flag in outliers:
+        detail = f"{consumption:.1f} L/100 km" if consumption is not None else f"distance={distance} km"
+        print(f"dépense {expense_id} ({registration}, {date}) : {flag}, kilométrage={mileage}, litres={liters}, {detail}")
+    print(f"{len(outliers)} plein(s) anormal(aux).")
+    return 1 if outliers else 0
+
+def verify_foreign_keys(db_file):
+    orphans = root_database.find_orphan_rows(db_file)
+    for table, row_id, parent in orphans:
+        print(f"{table} {row_id} : référence absente dans {parent}")
+    if orphans:
+        print(f"{len(orphans)} ligne(s) orpheline(s). Les rattacher à un véhicule ou un conducteur existant, ou les supprimer.")
+        return 1
+    print("Aucune ligne orpheline.")
+    return 0
+
+COMMANDS = {
+    "verify-aggregates": verify_aggregates,
+    "rebuild-aggregates": rebuild_aggregates,
+    "verify-missions": verify_missions,
+    "recompute-missions": recompute_missions,
+    "rebuild-fuel": rebuild_fuel,
+    "fuel-outliers": fuel_outliers,
+    "verify-foreign-keys": verify_foreign_keys,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m database.maintenance",
+                                     description="Maintenance de la base de données de la flotte.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--db", default=DEFAULT_DATABASE_FILE, help="fichier de base de données")
+    parser.add_argument("--holidays", default=DEFAULT_HOLIDAY_CALENDAR,
+                        choices=holidays.available_calendars() + [NO_HOLIDAY_CALENDAR],
+                        help="calendrier de jours fériés des missions")
+    args = parser.parse_args(argv)
+    holidays.configure(None if args.holidays == NO_HOLIDAY_CALENDAR else args.holidays)
+    root_database.create_tables(args.db)
+    return COMMANDS[args.command](args.db)
+
+if __name__ == "__main__":
+    sys.exit(main())
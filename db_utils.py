@@ -1,13 +1,16 @@
 import sqlite3
 import logging
 from datetime import datetime
+from database.connection import get_connection, close_all_connections
+from database import alerts, events
+from models import Vehicle, Driver, Expense, Mission, VehicleAssignment, row_factory
 
 logger = logging.getLogger(__name__)
 
 def create_tables(db_file):
     conn = None
     try:
-        conn = sqlite3.connect(db_file)
+        conn = get_connection(db_file)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -75,17 +78,444 @@ def create_tables(db_file):
 
         conn.commit()
         logger.info("Tables créées ou existantes.")
+        apply_migrations(db_file)
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la création des tables : {e}")
         if conn:
             conn.rollback()
-    finally:
-        if conn:
+
+# --- Agrégats des dépenses ---
+# Totaux (montant, nombre) par véhicule, par type et par mois (AAAA-MM),
+# tenus à jour par des triggers sur expenses : le tableau de bord ne relit
+# jamais toute la table. rebuild_expense_aggregates les recalcule.
+EXPENSE_AGGREGATES = (
+    # (table, colonne clé, type SQL de la clé, expression de la clé ; {row}
+    # est remplacé par "new.", "old." ou rien)
+    ("expense_totals_by_vehicle", "vehicle_id", "INTEGER", "{row}vehicle_id"),
+    ("expense_totals_by_type", "type", "TEXT", "{row}type"),
+    ("expense_totals_by_month", "month", "TEXT", "substr({row}date, 1, 7)"),
+)
+
+def _expense_aggregate_statements():
+    statements = []
+    insert_effects = []
+    delete_effects = []
+    for table, key, key_type, expression in EXPENSE_AGGREGATES:
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} ("
+                          f"{key} {key_type} PRIMARY KEY, total REAL NOT NULL, count INTEGER NOT NULL)")
+        new_key = expression.format(row="new.")
+        old_key = expression.format(row="old.")
+        insert_effects.append(f"""
+            INSERT INTO {table} ({key}, total, count) VALUES ({new_key}, new.amount, 1)
+            ON CONFLICT ({key}) DO UPDATE SET total = total + excluded.total, count = count + 1;""")
+        delete_effects.append(f"""
+            UPDATE {table} SET total = total - old.amount, count = count - 1 WHERE {key} = {old_key};
+            DELETE FROM {table} WHERE {key} = {old_key} AND count = 0;""")
+    statements.append("CREATE TRIGGER IF NOT EXISTS expenses_totals_insert AFTER INSERT ON expenses BEGIN"
+                      + "".join(insert_effects) + "\n        END")
+    statements.append("CREATE TRIGGER IF NOT EXISTS expenses_totals_delete AFTER DELETE ON expenses BEGIN"
+                      + "".join(delete_effects) + "\n        END")
+    statements.append("CREATE TRIGGER IF NOT EXISTS expenses_totals_update"
+                      " AFTER UPDATE OF vehicle_id, date, type, amount ON expenses BEGIN"
+                      + "".join(delete_effects + insert_effects) + "\n        END")
+    return statements
+
+def _expense_aggregate_queries():
+    # (table, clé, requête de recalcul depuis expenses)
+    queries = []
+    for table, key, key_type, expression in EXPENSE_AGGREGATES:
+        expression = expression.format(row="")
+        queries.append((table, key, f"SELECT {expression}, SUM(amount), COUNT(*) FROM expenses GROUP BY {expression}"))
+    return queries
+
+def _rebuild_expense_aggregate_statements():
+    statements = []
+    for table, key, query in _expense_aggregate_queries():
+        statements.append(f"DELETE FROM {table}")
+        statements.append(f"INSERT INTO {table} ({key}, total, count) {query}")
+    return statements
+
+# --- Consommation de carburant ---
+# Un plein est une dépense avec des litres et un kilométrage, quel que soit
+# son type. fuel_consumption garde, pour chaque plein, la distance depuis le
+# plus haut kilométrage déjà relevé du véhicule (ordre date, kilométrage,
+# id ; un relevé en arrière n'est pas pris comme référence), la consommation
+# en L/100 km et le coût au km. Les triggers sur expenses ne font que noter,
+# dans fuel_consumption_pending, la plus ancienne date touchée par véhicule ;
+# refresh_fuel_consumption, appelé après chaque écriture de dépenses et après
+# les migrations, recalcule ensuite ces véhicules à partir de cette date,
+# pour toute la flotte en une seule requête. Les lectures n'écrivent jamais.
+FUEL_FILL_CONDITION = "{row}liters > 0 AND {row}mileage IS NOT NULL"
+
+# Indicateurs d'anomalie d'un plein (NULL si le plein est exploitable) :
+FUEL_FLAG_FIRST = "first"              # premier plein connu, pas de distance
+FUEL_FLAG_ROLLBACK = "rollback"        # kilométrage inférieur à un plein précédent
+FUEL_FLAG_NO_DISTANCE = "no_distance"  # pas plus de kilomètres que le plein précédent
+FUEL_FLAG_IMPLAUSIBLE = "implausible"  # consommation hors de FUEL_CONSUMPTION_RANGE
+
+# Consommations plausibles, en L/100 km (de la citadine au poids lourd)
+FUEL_CONSUMPTION_RANGE = (2.0, 60.0)
+
+def _fuel_consumption_statements():
+    def mark(row):
+        return f"""
+            INSERT INTO fuel_consumption_pending (vehicle_id, since_date)
+            SELECT {row}vehicle_id, {row}date WHERE {FUEL_FILL_CONDITION.format(row=row)}
+            ON CONFLICT (vehicle_id) DO UPDATE SET since_date = MIN(since_date, excluded.since_date);"""
+    return [
+        """CREATE TABLE IF NOT EXISTS fuel_consumption (
+            expense_id INTEGER PRIMARY KEY,
+            vehicle_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            mileage INTEGER NOT NULL,
+            liters REAL NOT NULL,
+            amount REAL NOT NULL,
+            distance INTEGER,
+            consumption REAL,
+            cost_per_km REAL,
+            flag TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_fuel_consumption_vehicle_date ON fuel_consumption(vehicle_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_fuel_consumption_flag ON fuel_consumption(flag) WHERE flag IS NOT NULL",
+        "CREATE TABLE IF NOT EXISTS fuel_consumption_pending (vehicle_id INTEGER PRIMARY KEY, since_date TEXT NOT NULL)",
+        # Pleins d'un véhicule dans l'ordre du calcul
+        f"CREATE INDEX IF NOT EXISTS idx_expenses_fuel ON expenses(vehicle_id, date, mileage) WHERE {FUEL_FILL_CONDITION.format(row='')}",
+        "CREATE TRIGGER IF NOT EXISTS expenses_fuel_insert AFTER INSERT ON expenses BEGIN"
+        + mark("new.") + "\n        END",
+        "CREATE TRIGGER IF NOT EXISTS expenses_fuel_delete AFTER DELETE ON expenses BEGIN"
+        + mark("old.") + "\n        END",
+        "CREATE TRIGGER IF NOT EXISTS expenses_fuel_update"
+        " AFTER UPDATE OF vehicle_id, date, amount, mileage, liters ON expenses BEGIN"
+        + mark("old.") + mark("new.") + "\n        END",
+    ]
+
+def _mark_all_fuel_consumption_statements():
+    # Tous les véhicules à recalculer depuis le début
+    return [
+        "DELETE FROM fuel_consumption",
+        "INSERT OR REPLACE INTO fuel_consumption_pending (vehicle_id, since_date)"
+        f" SELECT DISTINCT vehicle_id, '' FROM expenses WHERE {FUEL_FILL_CONDITION.format(row='')}",
+    ]
+
+# --- Index plein texte ---
+# Tables FTS5 (tokenizer trigram, SQLite 3.34 ou plus) tenues à jour par
+# triggers ; 'rebuild' indexe l'existant. Sans FTS5, la recherche passe par
+# LIKE (voir _search_filter) et les index sont créés dès qu'une version de
+# SQLite qui les fournit ouvre la base (voir apply_migrations).
+_FULL_TEXT_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5(registration, make, model, content='vehicles', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS vehicles_fts_insert AFTER INSERT ON vehicles BEGIN
+        INSERT INTO vehicles_fts(rowid, registration, make, model) VALUES (new.id, new.registration, new.make, new.model);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vehicles_fts_delete AFTER DELETE ON vehicles BEGIN
+        INSERT INTO vehicles_fts(vehicles_fts, rowid, registration, make, model) VALUES ('delete', old.id, old.registration, old.make, old.model);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vehicles_fts_update AFTER UPDATE OF registration, make, model ON vehicles BEGIN
+        INSERT INTO vehicles_fts(vehicles_fts, rowid, registration, make, model) VALUES ('delete', old.id, old.registration, old.make, old.model);
+        INSERT INTO vehicles_fts(rowid, registration, make, model) VALUES (new.id, new.registration, new.make, new.model);
+    END""",
+    "INSERT INTO vehicles_fts(vehicles_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS drivers_fts USING fts5(name, surname, license_number, content='drivers', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS drivers_fts_insert AFTER INSERT ON drivers BEGIN
+        INSERT INTO drivers_fts(rowid, name, surname, license_number) VALUES (new.id, new.name, new.surname, new.license_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS drivers_fts_delete AFTER DELETE ON drivers BEGIN
+        INSERT INTO drivers_fts(drivers_fts, rowid, name, surname, license_number) VALUES ('delete', old.id, old.name, old.surname, old.license_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS drivers_fts_update AFTER UPDATE OF name, surname, license_number ON drivers BEGIN
+        INSERT INTO drivers_fts(drivers_fts, rowid, name, surname, license_number) VALUES ('delete', old.id, old.name, old.surname, old.license_number);
+        INSERT INTO drivers_fts(rowid, name, surname, license_number) VALUES (new.id, new.name, new.surname, new.license_number);
+    END""",
+    "INSERT INTO drivers_fts(drivers_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(description, content='expenses', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO expenses_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+        INSERT INTO expenses_fts(expenses_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description ON expenses BEGIN
+        INSERT INTO expenses_fts(expenses_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO expenses_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    "INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS missions_fts USING fts5(destination, content='missions', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS missions_fts_insert AFTER INSERT ON missions BEGIN
+        INSERT INTO missions_fts(rowid, destination) VALUES (new.id, new.destination);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS missions_fts_delete AFTER DELETE ON missions BEGIN
+        INSERT INTO missions_fts(missions_fts, rowid, destination) VALUES ('delete', old.id, old.destination);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS missions_fts_update AFTER UPDATE OF destination ON missions BEGIN
+        INSERT INTO missions_fts(missions_fts, rowid, destination) VALUES ('delete', old.id, old.destination);
+        INSERT INTO missions_fts(rowid, destination) VALUES (new.id, new.destination);
+    END""",
+    "INSERT INTO missions_fts(missions_fts) VALUES ('rebuild')",
+]
+
+_full_text_available = None
+
+def full_text_available():
+    """True si SQLite fournit FTS5 avec le tokenizer trigram."""
+    global _full_text_available
+    if _full_text_available is None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+            _full_text_available = True
+        except sqlite3.Error:
+            _full_text_available = False
+        finally:
             conn.close()
+    return _full_text_available
+
+def _full_text_migration():
+    if not full_text_available():
+        logger.warning("FTS5 (tokenizer trigram) indisponible : recherche sans index plein texte.")
+        return []
+    return _FULL_TEXT_STATEMENTS
+
+def _has_full_text(db_file):
+    conn = get_connection(db_file)
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='vehicles_fts'").fetchone() is not None
+
+# --- Migrations du schéma ---
+# La migration N est MIGRATIONS[N - 1] ; PRAGMA user_version mémorise la
+# dernière migration appliquée. Ne jamais modifier une migration existante :
+# en ajouter une nouvelle à la fin. Une migration est une liste de requêtes,
+# ou une fonction qui la renvoie (migration dépendant de la version de SQLite).
+MIGRATIONS = [
+    # 1 : index sur les clés étrangères, les dates et les colonnes de recherche
+    [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_vehicle_date ON expenses(vehicle_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_type ON expenses(type)",
+        "CREATE INDEX IF NOT EXISTS idx_missions_driver_start ON missions(driver_id, start_date)",
+        "CREATE INDEX IF NOT EXISTS idx_assignments_driver ON vehicle_assignments(driver_id)",
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_revision_date ON vehicles(revision_date)",
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_control_date ON vehicles(control_date)",
+        "CREATE INDEX IF NOT EXISTS idx_drivers_expiry_date ON drivers(expiry_date)",
+    ],
+    # 2 : tri des dépenses par montant ou par date dans la liste paginée
+    [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_amount ON expenses(amount, id)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date, id)",
+    ],
+    # 3 : index plein texte (FTS5, tokenizer trigram pour la recherche par
+    # sous-chaîne) tenus à jour par triggers, si SQLite les fournit
+    _full_text_migration,
+    # 4 : agrégats des dépenses tenus à jour par triggers, remplis depuis l'existant
+    _expense_aggregate_statements() + _rebuild_expense_aggregate_statements(),
+    # 5 : affectations les plus récentes du tableau de bord (recent_assignments)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_assignments_date ON vehicle_assignments(assignment_date, id)",
+    ],
+    # 6 : rapports filtrés (reporting.queries) : dépenses d'un type sur une
+    # période, missions en cours sur une période
+    [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_type_date ON expenses(type, date)",
+        "CREATE INDEX IF NOT EXISTS idx_missions_end_date ON missions(end_date)",
+    ],
+    # 7 : consommation de carburant par plein, calculée au premier
+    # refresh_fuel_consumption
+    _fuel_consumption_statements() + _mark_all_fuel_consumption_statements(),
+]
+
+def get_schema_version(db_file):
+    conn = get_connection(db_file)
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(db_file):
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    version = get_schema_version(db_file)
+    for number in range(version + 1, len(MIGRATIONS) + 1):
+        try:
+            migration = MIGRATIONS[number - 1]
+            cursor.execute("BEGIN")
+            for statement in (migration() if callable(migration) else migration):
+                cursor.execute(statement)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            logger.info(f"Migration du schéma {number} appliquée.")
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la migration du schéma {number} : {e}")
+            conn.rollback()
+            raise
+    if version >= 3 and full_text_available() and not _has_full_text(db_file):
+        # Base migrée par un SQLite sans FTS5 : index créés maintenant
+        try:
+            cursor.execute("BEGIN")
+            for statement in _FULL_TEXT_STATEMENTS:
+                cursor.execute(statement)
+            conn.commit()
+            logger.info("Index plein texte créés.")
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la création des index plein texte : {e}")
+            conn.rollback()
+            raise
+    # Calcul initial de la consommation après la migration 7 (sans effet
+    # s'il n'y a rien à recalculer)
+    refresh_fuel_consumption(db_file)
+
+def find_orphan_rows(db_file):
+    """Lignes dont le véhicule ou le conducteur n'existe plus.
+
+    Les bases créées avant foreign_keys=ON peuvent en contenir : elles
+    restent lisibles, mais leur mise à jour échoue tant qu'un véhicule ou
+    un conducteur existant n'est pas choisi. Renvoie [(table, id, table
+    référencée)].
+    """
+    conn = get_connection(db_file)
+    return [(table, rowid, parent) for table, rowid, parent, _ in conn.execute("PRAGMA foreign_key_check")]
+
+def _insert_many(db_file, entity, query, rows, integrity_message, error_message):
+    # executemany dans une seule transaction : un seul commit (et un seul fsync)
+    # pour tout le lot, et rien n'est inséré si une ligne échoue.
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(query, rows)
+        conn.commit()
+        if cursor.rowcount > 0:
+            events.publish(entity, None, events.INSERT)
+        return cursor.rowcount
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        raise ValueError(f"{integrity_message} ({e})")
+    except sqlite3.Error as e:
+        logger.error(f"{error_message} : {e}")
+        conn.rollback()
+        raise
+
+# Lignes prêtes à afficher : l'immatriculation ou "Nom Prénom" remplace la clé étrangère
+_EXPENSES_WITH_VEHICLE_SELECT = """
+        SELECT e.id, v.registration, e.date, e.type, e.amount, e.description, e.mileage, e.liters
+        FROM expenses e
+        LEFT JOIN vehicles v ON e.vehicle_id = v.id
+"""
+_MISSIONS_WITH_DRIVER_SELECT = """
+        SELECT m.id, d.name || ' ' || d.surname, m.start_date, m.end_date, m.destination,
+               m.duration, m.meals, m.nights, m.weekends
+        FROM missions m
+        LEFT JOIN drivers d ON m.driver_id = d.id
+"""
+_ASSIGNMENTS_SELECT = """
+        SELECT va.id, v.registration, d.name, d.surname, va.assignment_date
+        FROM vehicle_assignments va
+        JOIN vehicles v ON va.vehicle_id = v.id
+        JOIN drivers d ON va.driver_id = d.id
+"""
+
+def _paginate(query, params, limit, offset):
+    # Pagination des listes (LIMIT/OFFSET) ; la requête doit avoir un ORDER BY stable
+    if limit is None:
+        return query, tuple(params)
+    return query + " LIMIT ? OFFSET ?", tuple(params) + (limit, offset)
+
+# Colonnes triables des listes : nom de colonne du Treeview -> expression SQL.
+# Seules ces colonnes peuvent apparaître dans un ORDER BY ; le texte est
+# trié sans tenir compte de la casse.
+VEHICLE_SORT_COLUMNS = {
+    "id": "id", "registration": "registration COLLATE NOCASE", "make": "make COLLATE NOCASE", "model": "model COLLATE NOCASE",
+    "year": "year", "revision_date": "revision_date", "control_date": "control_date",
+}
+DRIVER_SORT_COLUMNS = {
+    "id": "id", "name": "name COLLATE NOCASE", "surname": "surname COLLATE NOCASE",
+    "license_number": "license_number", "expiry_date": "expiry_date",
+}
+EXPENSE_SORT_COLUMNS = {
+    "id": "e.id", "vehicle_reg": "v.registration COLLATE NOCASE", "date": "e.date", "type": "e.type COLLATE NOCASE",
+    "amount": "e.amount", "description": "e.description COLLATE NOCASE", "mileage": "e.mileage", "liters": "e.liters",
+}
+MISSION_SORT_COLUMNS = {
+    "id": "m.id", "driver_name": "d.name || ' ' || d.surname COLLATE NOCASE", "start_date": "m.start_date",
+    "end_date": "m.end_date", "destination": "m.destination COLLATE NOCASE", "duration": "m.duration",
+    "meals": "m.meals", "nights": "m.nights", "weekends": "m.weekends",
+}
+ASSIGNMENT_SORT_COLUMNS = {
+    "id": "va.id", "vehicle_reg": "v.registration COLLATE NOCASE",
+    "driver_name": "d.name || ' ' || d.surname COLLATE NOCASE", "assignment_date": "va.assignment_date",
+}
+
+def _order_by(sort_columns, order_by, descending, id_column):
+    # L'id sert de second critère pour que LIMIT/OFFSET reste stable
+    if order_by is None:
+        return f" ORDER BY {id_column}"
+    if order_by not in sort_columns:
+        raise ValueError(f"Colonne de tri invalide : {order_by}")
+    direction = "DESC" if descending else "ASC"
+    return f" ORDER BY {sort_columns[order_by]} {direction}, {id_column} {direction}"
+
+# --- Recherche plein texte ---
+# Le tokenizer trigram indexe les sous-chaînes de 3 caractères : une
+# recherche plus courte ne peut pas utiliser l'index.
+FTS_MIN_QUERY_LENGTH = 3
+
+def _fts_match(query):
+    # Expression MATCH : le texte saisi est cherché comme sous-chaîne d'une
+    # colonne, comme avec LIKE '%q%'. None si trop court pour l'index.
+    query = query.strip()
+    if len(query) < FTS_MIN_QUERY_LENGTH:
+        return None
+    return '"' + query.replace('"', '""') + '"'
+
+def _search_filter(db_file, fts_table, query, columns, id_column="id"):
+    # Clause WHERE de recherche : index FTS si possible, sinon LIKE sur les colonnes
+    match = _fts_match(query) if _has_full_text(db_file) else None
+    if match is not None:
+        return f"{id_column} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)", (match,)
+    search_term = f"%{query.strip()}%"
+    return "(" + " OR ".join(f"{column} LIKE ?" for column in columns) + ")", (search_term,) * len(columns)
+
+def search_all(db_file, query, limit=20):
+    """Recherche dans les véhicules, conducteurs, dépenses et missions.
+
+    Renvoie des tuples (type, id, libellé, score) triés par pertinence
+    (bm25, le plus pertinent d'abord). type vaut "vehicle", "driver",
+    "expense" ou "mission". Une recherche de moins de 3 caractères ne
+    renvoie rien.
+    """
+    match = _fts_match(query)
+    if match is None:
+        return []
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    if not _has_full_text(db_file):
+        # Sans index plein texte : LIKE, sans classement (score 0)
+        search_term = f"%{query.strip()}%"
+        cursor.execute("""
+            SELECT 'vehicle', id, registration || ' - ' || make || ' ' || model, 0
+            FROM vehicles WHERE registration LIKE ? OR make LIKE ? OR model LIKE ?
+            UNION ALL
+            SELECT 'driver', id, name || ' ' || surname || ' (' || license_number || ')', 0
+            FROM drivers WHERE name LIKE ? OR surname LIKE ? OR license_number LIKE ?
+            UNION ALL
+            SELECT 'expense', id, description, 0 FROM expenses WHERE description LIKE ?
+            UNION ALL
+            SELECT 'mission', id, destination, 0 FROM missions WHERE destination LIKE ?
+            LIMIT ?
+        """, (search_term,) * 8 + (limit,))
+        return cursor.fetchall()
+    cursor.execute("""
+        SELECT 'vehicle', rowid, registration || ' - ' || make || ' ' || model, bm25(vehicles_fts) AS score
+        FROM vehicles_fts WHERE vehicles_fts MATCH ?
+        UNION ALL
+        SELECT 'driver', rowid, name || ' ' || surname || ' (' || license_number || ')', bm25(drivers_fts)
+        FROM drivers_fts WHERE drivers_fts MATCH ?
+        UNION ALL
+        SELECT 'expense', rowid, description, bm25(expenses_fts)
+        FROM expenses_fts WHERE expenses_fts MATCH ?
+        UNION ALL
+        SELECT 'mission', rowid, destination, bm25(missions_fts)
+        FROM missions_fts WHERE missions_fts MATCH ?
+        ORDER BY score
+        LIMIT ?
+    """, (match, match, match, match, limit))
+    return cursor.fetchall()
 
 # --- Fonctions pour les véhicules ---
 def add_vehicle(db_file, registration, make, model, year, revision_date, control_date):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -93,22 +523,31 @@ def add_vehicle(db_file, registration, make, model, year, revision_date, control
             VALUES (?, ?, ?, ?, ?, ?)
         """, (registration, make, model, year, revision_date, control_date))
         conn.commit()
+        events.publish("vehicle", cursor.lastrowid, events.INSERT)
         return cursor.lastrowid
     except sqlite3.IntegrityError:
+        conn.rollback()
         raise ValueError("L'immatriculation existe déjà.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'ajout du véhicule : {e}")
         conn.rollback()
         raise
 
+def add_vehicles_bulk(db_file, vehicles):
+    # vehicles : itérable de tuples (registration, make, model, year, revision_date, control_date)
+    return _insert_many(db_file, "vehicle", """
+        INSERT INTO vehicles (registration, make, model, year, revision_date, control_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, vehicles, "Une immatriculation existe déjà.", "Erreur lors de l'ajout des véhicules")
+
 def get_vehicle(db_file, vehicle_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM vehicles WHERE id=?", (vehicle_id,))
     return cursor.fetchone()
 
 def update_vehicle(db_file, vehicle_id, registration, make, model, year, revision_date, control_date):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -116,7 +555,9 @@ def update_vehicle(db_file, vehicle_id, registration, make, model, year, revisio
             WHERE id=?
         """, (registration, make, model, year, revision_date, control_date, vehicle_id))
         conn.commit()
+        events.publish("vehicle", vehicle_id, events.UPDATE)
     except sqlite3.IntegrityError:
+        conn.rollback()
         raise ValueError("L'immatriculation existe déjà.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la mise à jour du véhicule : {e}")
@@ -124,35 +565,51 @@ def update_vehicle(db_file, vehicle_id, registration, make, model, year, revisio
         raise
 
 def delete_vehicle(db_file, vehicle_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("DELETE FROM vehicles WHERE id=?", (vehicle_id,))
         conn.commit()
+        events.publish("vehicle", vehicle_id, events.DELETE)
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : des lignes y font encore référence
+        conn.rollback()
+        raise ValueError("Ce véhicule a encore des dépenses ou des affectations : supprimez-les d'abord.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la suppression du véhicule : {e}")
         conn.rollback()
         raise
 
-def list_vehicles(db_file):
-    conn = sqlite3.connect(db_file)
+def list_vehicles(db_file, limit=None, offset=0, order_by=None, descending=False):
+    conn = get_connection(db_file)
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM vehicles")
+    query = "SELECT * FROM vehicles" + _order_by(VEHICLE_SORT_COLUMNS, order_by, descending, "id")
+    cursor.execute(*_paginate(query, (), limit, offset))
     return cursor.fetchall()
 
-def search_vehicles(db_file, query):
-    conn = sqlite3.connect(db_file)
+def count_vehicles(db_file):
+    conn = get_connection(db_file)
     cursor = conn.cursor()
-    search_term = f"%{query}%"
-    cursor.execute("""
-        SELECT * FROM vehicles
-        WHERE registration LIKE ? OR make LIKE ? OR model LIKE ?
-    """, (search_term, search_term, search_term))
+    cursor.execute("SELECT COUNT(*) FROM vehicles")
+    return cursor.fetchone()[0]
+
+def search_vehicles(db_file, query, limit=None, offset=0, order_by=None, descending=False):
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    where, params = _search_filter(db_file, "vehicles_fts", query, ("registration", "make", "model"))
+    cursor.execute(*_paginate(f"SELECT * FROM vehicles WHERE {where}"
+                              + _order_by(VEHICLE_SORT_COLUMNS, order_by, descending, "id"), params, limit, offset))
     return cursor.fetchall()
 
+def get_vehicle_ids_by_registration(db_file):
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT registration, id FROM vehicles")
+    return dict(cursor.fetchall())
+
 # --- Fonctions pour les conducteurs ---
 def add_driver(db_file, name, surname, license_number, expiry_date):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -160,22 +617,31 @@ def add_driver(db_file, name, surname, license_number, expiry_date):
             VALUES (?, ?, ?, ?)
         """, (name, surname, license_number, expiry_date))
         conn.commit()
+        events.publish("driver", cursor.lastrowid, events.INSERT)
         return cursor.lastrowid
     except sqlite3.IntegrityError:
+        conn.rollback()
         raise ValueError("Le numéro de permis existe déjà.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'ajout du conducteur : {e}")
         conn.rollback()
         raise
 
+def add_drivers_bulk(db_file, drivers):
+    # drivers : itérable de tuples (name, surname, license_number, expiry_date)
+    return _insert_many(db_file, "driver", """
+        INSERT INTO drivers (name, surname, license_number, expiry_date)
+        VALUES (?, ?, ?, ?)
+    """, drivers, "Un numéro de permis existe déjà.", "Erreur lors de l'ajout des conducteurs")
+
 def get_driver(db_file, driver_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM drivers WHERE id=?", (driver_id,))
     return cursor.fetchone()
 
 def update_driver(db_file, driver_id, name, surname, license_number, expiry_date):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -183,7 +649,9 @@ def update_driver(db_file, driver_id, name, surname, license_number, expiry_date
             WHERE id=?
         """, (name, surname, license_number, expiry_date, driver_id))
         conn.commit()
+        events.publish("driver", driver_id, events.UPDATE)
     except sqlite3.IntegrityError:
+        conn.rollback()
         raise ValueError("Le numéro de permis existe déjà.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la mise à jour du conducteur : {e}")
@@ -191,35 +659,52 @@ def update_driver(db_file, driver_id, name, surname, license_number, expiry_date
         raise
 
 def delete_driver(db_file, driver_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("DELETE FROM drivers WHERE id=?", (driver_id,))
         conn.commit()
+        events.publish("driver", driver_id, events.DELETE)
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : des lignes y font encore référence
+        conn.rollback()
+        raise ValueError("Ce conducteur a encore des missions ou des affectations : supprimez-les d'abord.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la suppression du conducteur : {e}")
         conn.rollback()
         raise
 
-def list_drivers(db_file):
-    conn = sqlite3.connect(db_file)
+def list_drivers(db_file, limit=None, offset=0, order_by=None, descending=False):
+    conn = get_connection(db_file)
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM drivers")
+    query = "SELECT * FROM drivers" + _order_by(DRIVER_SORT_COLUMNS, order_by, descending, "id")
+    cursor.execute(*_paginate(query, (), limit, offset))
     return cursor.fetchall()
 
-def search_drivers(db_file, query):
-    conn = sqlite3.connect(db_file)
+def count_drivers(db_file):
+    conn = get_connection(db_file)
     cursor = conn.cursor()
-    search_term = f"%{query}%"
-    cursor.execute("""
-        SELECT * FROM drivers
-        WHERE name LIKE ? OR surname LIKE ? OR license_number LIKE ?
-    """, (search_term, search_term, search_term))
+    cursor.execute("SELECT COUNT(*) FROM drivers")
+    return cursor.fetchone()[0]
+
+def search_drivers(db_file, query, limit=None, offset=0, order_by=None, descending=False):
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    where, params = _search_filter(db_file, "drivers_fts", query, ("name", "surname", "license_number"))
+    cursor.execute(*_paginate(f"SELECT * FROM drivers WHERE {where}"
+                              + _order_by(DRIVER_SORT_COLUMNS, order_by, descending, "id"), params, limit, offset))
     return cursor.fetchall()
 
+def get_driver_ids_by_name(db_file):
+    # "Nom Prénom" : ID, comme dans les listes déroulantes des fenêtres
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name || ' ' || surname, id FROM drivers")
+    return dict(cursor.fetchall())
+
 # --- Fonctions pour les dépenses ---
 def add_expense(db_file, vehicle_id, date, type, amount, description, mileage, liters):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -227,20 +712,35 @@ def add_expense(db_file, vehicle_id, date, type, amount, description, mileage, l
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (vehicle_id, date, type, amount, description, mileage, liters))
         conn.commit()
+        _refresh_fuel_after_write(db_file)
+        events.publish("expense", cursor.lastrowid, events.INSERT)
         return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : véhicule inexistant
+        conn.rollback()
+        raise ValueError("Le véhicule choisi n'existe pas ou plus.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'ajout de la dépense : {e}")
         conn.rollback()
         raise
 
+def add_expenses_bulk(db_file, expenses):
+    # expenses : itérable de tuples (vehicle_id, date, type, amount, description, mileage, liters)
+    count = _insert_many(db_file, "expense", """
+        INSERT INTO expenses (vehicle_id, date, type, amount, description, mileage, liters)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, expenses, "Dépense invalide.", "Erreur lors de l'ajout des dépenses")
+    _refresh_fuel_after_write(db_file)
+    return count
+
 def get_expense(db_file, expense_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM expenses WHERE id=?", (expense_id,))
     return cursor.fetchone()
 
 def update_expense(db_file, expense_id, vehicle_id, date, type, amount, description, mileage, liters):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -248,24 +748,32 @@ def update_expense(db_file, expense_id, vehicle_id, date, type, amount, descript
             WHERE id=?
         """, (vehicle_id, date, type, amount, description, mileage, liters, expense_id))
         conn.commit()
+        _refresh_fuel_after_write(db_file)
+        events.publish("expense", expense_id, events.UPDATE)
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : véhicule inexistant (y compris pour une dépense orpheline)
+        conn.rollback()
+        raise ValueError("Le véhicule choisi n'existe pas ou plus.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la mise à jour de la dépense : {e}")
         conn.rollback()
         raise
 
 def delete_expense(db_file, expense_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
         conn.commit()
+        _refresh_fuel_after_write(db_file)
+        events.publish("expense", expense_id, events.DELETE)
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la suppression de la dépense : {e}")
         conn.rollback()
         raise
 
 def list_expenses(db_file, vehicle_id=None):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     if vehicle_id:
         cursor.execute("SELECT * FROM expenses WHERE vehicle_id=?", (vehicle_id,))
@@ -273,32 +781,244 @@ def list_expenses(db_file, vehicle_id=None):
         cursor.execute("SELECT * FROM expenses")
     return cursor.fetchall()
 
+def list_expenses_with_vehicle(db_file, vehicle_id=None, limit=None, offset=0, order_by=None, descending=False):
+    # Dépenses prêtes à afficher : l'immatriculation remplace vehicle_id
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    query, params = _expenses_with_vehicle_query(vehicle_id, order_by, descending)
+    cursor.execute(*_paginate(query, params, limit, offset))
+    return cursor.fetchall()
+
+def _expenses_with_vehicle_query(vehicle_id=None, order_by=None, descending=False):
+    query = _EXPENSES_WITH_VEHICLE_SELECT
+    params = ()
+    if vehicle_id:
+        query += " WHERE e.vehicle_id=?"
+        params = (vehicle_id,)
+    return query + _order_by(EXPENSE_SORT_COLUMNS, order_by, descending, "e.id"), params
+
+def search_expenses(db_file, query, vehicle_id=None, limit=None, offset=0, order_by=None, descending=False):
+    # Recherche dans les descriptions, même format de ligne que list_expenses_with_vehicle
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    where, params = _search_filter(db_file, "expenses_fts", query, ("e.description",), "e.id")
+    query = _EXPENSES_WITH_VEHICLE_SELECT + f" WHERE {where}"
+    if vehicle_id:
+        query += " AND e.vehicle_id=?"
+        params += (vehicle_id,)
+    query += _order_by(EXPENSE_SORT_COLUMNS, order_by, descending, "e.id")
+    cursor.execute(*_paginate(query, params, limit, offset))
+    return cursor.fetchall()
+
 def get_total_expenses(db_file, vehicle_id=None):
-    conn = sqlite3.connect(db_file)
+    # Lu dans les agrégats (voir EXPENSE_AGGREGATES), pas dans expenses
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     if vehicle_id:
-        cursor.execute("SELECT SUM(amount) FROM expenses WHERE vehicle_id=?", (vehicle_id,))
+        cursor.execute("SELECT total FROM expense_totals_by_vehicle WHERE vehicle_id=?", (vehicle_id,))
     else:
-        cursor.execute("SELECT SUM(amount) FROM expenses")
+        cursor.execute("SELECT SUM(total) FROM expense_totals_by_type")
     result = cursor.fetchone()
-    return result[0] if result[0] else 0.0
+    return result[0] if result and result[0] else 0.0
 
 def get_expenses_by_type(db_file, vehicle_id=None):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     if vehicle_id:
+        # Pas d'agrégat par (véhicule, type) : lecture via idx_expenses_vehicle_date
         cursor.execute("""
-            SELECT type,
-            
-            SUM(amount) FROM expenses WHERE vehicle_id=? GROUP BY type
+            SELECT type, SUM(amount) FROM expenses WHERE vehicle_id=? GROUP BY type ORDER BY type
         """, (vehicle_id,))
     else:
-        cursor.execute("SELECT type, SUM(amount) FROM expenses GROUP BY type")
+        cursor.execute("SELECT type, total FROM expense_totals_by_type ORDER BY type")
+    return cursor.fetchall()
+
+def get_expenses_by_month(db_file):
+    # [(AAAA-MM, total)] par mois croissant
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT month, total FROM expense_totals_by_month ORDER BY month")
+    return cursor.fetchall()
+
+def rebuild_expense_aggregates(db_file):
+    """Recalcule entièrement les agrégats des dépenses depuis la table expenses."""
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        for statement in _rebuild_expense_aggregate_statements():
+            cursor.execute(statement)
+        conn.commit()
+        events.publish("expense", None, events.UPDATE)
+        logger.info("Agrégats des dépenses recalculés.")
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du recalcul des agrégats des dépenses : {e}")
+        conn.rollback()
+        raise
+
+def verify_expense_aggregates(db_file, tolerance=0.005):
+    """Compare les agrégats des dépenses avec un recalcul complet.
+
+    Renvoie la liste des écarts (table, clé, (total, nombre) stockés,
+    (total, nombre) attendus) ; liste vide si tout est cohérent.
+    """
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    mismatches = []
+    for table, key, query in _expense_aggregate_queries():
+        stored = {row[0]: (row[1], row[2]) for row in cursor.execute(f"SELECT {key}, total, count FROM {table}")}
+        expected = {row[0]: (row[1], row[2]) for row in cursor.execute(query)}
+        for value in stored.keys() | expected.keys():
+            found = stored.get(value, (0.0, 0))
+            wanted = expected.get(value, (0.0, 0))
+            if found[1] != wanted[1] or abs(found[0] - wanted[0]) > tolerance:
+                mismatches.append((table, value, found, wanted))
+    return mismatches
+
+def refresh_fuel_consumption(db_file):
+    """Recalcule la consommation des véhicules dont les pleins ont changé.
+
+    Seuls les pleins datés à partir de la plus ancienne modification sont
+    recalculés. La distance d'un plein part du plus haut kilométrage relevé
+    avant lui : après un retour en arrière du compteur, le plein suivant
+    est mesuré depuis le dernier relevé cohérent, pas depuis le relevé
+    erroné.
+    Appelé après chaque écriture dans expenses ; ne prend le verrou
+    d'écriture que s'il y a des véhicules à recalculer. Renvoie le nombre
+    de pleins recalculés.
+    """
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    if cursor.execute("SELECT 1 FROM fuel_consumption_pending LIMIT 1").fetchone() is None:
+        return 0
+    fill = FUEL_FILL_CONDITION.format(row="e.")
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Un autre écrivain a pu faire le calcul entre-temps
+        if cursor.execute("SELECT 1 FROM fuel_consumption_pending LIMIT 1").fetchone() is None:
+            conn.rollback()
+            return 0
+        cursor.execute("""
+            DELETE FROM fuel_consumption WHERE EXISTS (
+                SELECT 1 FROM fuel_consumption_pending p
+                WHERE p.vehicle_id = fuel_consumption.vehicle_id AND fuel_consumption.date >= p.since_date)
+        """)
+        # Plus haut kilométrage précédent : celui des pleins antérieurs à
+        # since_date (prior_max), ou le maximum glissant des pleins recalculés
+        cursor.execute(f"""
+            INSERT INTO fuel_consumption (expense_id, vehicle_id, date, mileage, liters, amount,
+                                          distance, consumption, cost_per_km, flag)
+            WITH bounds AS (
+                SELECT p.vehicle_id, p.since_date,
+                       (SELECT MAX(e.mileage) FROM expenses e
+                        WHERE e.vehicle_id = p.vehicle_id AND {fill} AND e.date < p.since_date) AS prior_max
+                FROM fuel_consumption_pending p
+            ),
+            fills AS (
+                SELECT e.id, e.vehicle_id, e.date, e.mileage, e.liters, e.amount, b.prior_max,
+                       MAX(e.mileage) OVER (PARTITION BY e.vehicle_id ORDER BY e.date, e.mileage, e.id
+                                            ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS running_max
+                FROM expenses e JOIN bounds b ON e.vehicle_id = b.vehicle_id AND e.date >= b.since_date
+                WHERE {fill}
+            ),
+            distances AS (
+                SELECT *, mileage - CASE WHEN running_max IS NULL THEN prior_max
+                                         WHEN prior_max IS NULL OR running_max > prior_max THEN running_max
+                                         ELSE prior_max END AS distance
+                FROM fills
+            )
+            SELECT id, vehicle_id, date, mileage, liters, amount, distance,
+                   CASE WHEN distance > 0 THEN liters * 100.0 / distance END,
+                   CASE WHEN distance > 0 THEN amount / distance END,
+                   CASE WHEN distance IS NULL THEN ?
+                        WHEN distance < 0 THEN ?
+                        WHEN distance = 0 THEN ?
+                        WHEN liters * 100.0 / distance NOT BETWEEN ? AND ? THEN ?
+                   END
+            FROM distances
+        """, (FUEL_FLAG_FIRST, FUEL_FLAG_ROLLBACK, FUEL_FLAG_NO_DISTANCE) + FUEL_CONSUMPTION_RANGE + (FUEL_FLAG_IMPLAUSIBLE,))
+        refreshed = cursor.rowcount
+        cursor.execute("DELETE FROM fuel_consumption_pending")
+        conn.commit()
+        logger.info(f"Consommation de carburant recalculée pour {refreshed} plein(s).")
+        return refreshed
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du calcul de la consommation de carburant : {e}")
+        conn.rollback()
+        raise
+
+def _refresh_fuel_after_write(db_file):
+    # L'écriture est déjà validée : en cas d'échec, les véhicules restent
+    # dans fuel_consumption_pending et seront recalculés à la suivante
+    try:
+        refresh_fuel_consumption(db_file)
+    except sqlite3.Error as e:
+        # Journalisé dans le fichier de utils.error_logger
+        logger.error(f"Consommation de carburant non recalculée après une écriture de dépense "
+                     f"(nouvel essai à la prochaine écriture ou via rebuild-fuel) : {e}")
+
+def rebuild_fuel_consumption(db_file):
+    """Recalcule entièrement la consommation de carburant de la flotte."""
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        for statement in _mark_all_fuel_consumption_statements():
+            cursor.execute(statement)
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du recalcul de la consommation de carburant : {e}")
+        conn.rollback()
+        raise
+    return refresh_fuel_consumption(db_file)
+
+def list_fuel_consumption(db_file, vehicle_id=None, flagged_only=False):
+    # [(id dépense, immatriculation, date, kilométrage, litres, montant, distance,
+    #   L/100 km, coût au km, indicateur)] par véhicule puis date ; lecture
+    #   seule, la table est tenue à jour par les écritures (voir
+    #   refresh_fuel_consumption)
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    query = """
+        SELECT f.expense_id, v.registration, f.date, f.mileage, f.liters, f.amount,
+               f.distance, f.consumption, f.cost_per_km, f.flag
+        FROM fuel_consumption f
+        LEFT JOIN vehicles v ON f.vehicle_id = v.id
+    """
+    clauses = []
+    params = []
+    if vehicle_id:
+        clauses.append("f.vehicle_id=?")
+        params.append(vehicle_id)
+    if flagged_only:
+        clauses.append("f.flag IS NOT NULL")
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    cursor.execute(query + " ORDER BY f.vehicle_id, f.date, f.mileage, f.expense_id", params)
+    return cursor.fetchall()
+
+def get_fuel_efficiency_by_vehicle(db_file):
+    # [(vehicle_id, immatriculation, km, litres, L/100 km, coût carburant au km,
+    #   pleins écartés)] ; seuls les pleins sans indicateur comptent
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT f.vehicle_id, v.registration,
+               SUM(f.distance) FILTER (WHERE f.flag IS NULL),
+               SUM(f.liters) FILTER (WHERE f.flag IS NULL),
+               SUM(f.liters) FILTER (WHERE f.flag IS NULL) * 100.0 / SUM(f.distance) FILTER (WHERE f.flag IS NULL),
+               SUM(f.amount) FILTER (WHERE f.flag IS NULL) / SUM(f.distance) FILTER (WHERE f.flag IS NULL),
+               COUNT(*) FILTER (WHERE f.flag IS NOT NULL AND f.flag != ?)
+        FROM fuel_consumption f
+        LEFT JOIN vehicles v ON f.vehicle_id = v.id
+        GROUP BY f.vehicle_id
+        ORDER BY f.vehicle_id
+    """, (FUEL_FLAG_FIRST,))
     return cursor.fetchall()
 
 # --- Fonctions pour les missions ---
 def add_mission(db_file, driver_id, start_date, end_date, destination, duration, meals, nights, weekends):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -306,20 +1026,32 @@ def add_mission(db_file, driver_id, start_date, end_date, destination, duration,
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (driver_id, start_date, end_date, destination, duration, meals, nights, weekends))
         conn.commit()
+        events.publish("mission", cursor.lastrowid, events.INSERT)
         return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : conducteur inexistant
+        conn.rollback()
+        raise ValueError("Le conducteur choisi n'existe pas ou plus.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'ajout de la mission : {e}")
         conn.rollback()
         raise
 
+def add_missions_bulk(db_file, missions):
+    # missions : itérable de tuples (driver_id, start_date, end_date, destination, duration, meals, nights, weekends)
+    return _insert_many(db_file, "mission", """
+        INSERT INTO missions (driver_id, start_date, end_date, destination, duration, meals, nights, weekends)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, missions, "Mission invalide.", "Erreur lors de l'ajout des missions")
+
 def get_mission(db_file, mission_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM missions WHERE id=?", (mission_id,))
     return cursor.fetchone()
 
 def update_mission(db_file, mission_id, driver_id, start_date, end_date, destination, duration, meals, nights, weekends):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -327,24 +1059,77 @@ def update_mission(db_file, mission_id, driver_id, start_date, end_date, destina
             WHERE id=?
         """, (driver_id, start_date, end_date, destination, duration, meals, nights, weekends, mission_id))
         conn.commit()
+        events.publish("mission", mission_id, events.UPDATE)
+    except sqlite3.IntegrityError:
+        # foreign_keys actif : conducteur inexistant (y compris pour une mission orpheline)
+        conn.rollback()
+        raise ValueError("Le conducteur choisi n'existe pas ou plus.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la mise à jour de la mission : {e}")
         conn.rollback()
         raise
 
 def delete_mission(db_file, mission_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("DELETE FROM missions WHERE id=?", (mission_id,))
         conn.commit()
+        events.publish("mission", mission_id, events.DELETE)
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la suppression de la mission : {e}")
         conn.rollback()
         raise
 
+def recompute_mission_days(db_file, dry_run=False, calendar=None):
+    """Recalcule durée, nuitées et week-ends de toutes les missions depuis leurs dates.
+
+    Le calcul est fait en une passe (utils.date_utils.mission_day_counts) et
+    seules les missions dont les valeurs stockées diffèrent sont mises à jour,
+    en une transaction. Avec calendar (utils.holidays.HolidayCalendar), les
+    jours fériés tombant en semaine comptent avec les week-ends. Renvoie
+    [(id, (durée, nuitées, week-ends) stockés, recalculés)] ; dry_run n'écrit
+    rien. Les repas ne sont pas touchés.
+    """
+    from utils.date_utils import mission_day_counts
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, start_date, end_date, duration, nights, weekends FROM missions ORDER BY id")
+    # Missions aux dates illisibles laissées telles quelles
+    rows = [row for row in cursor.fetchall() if _is_date(row[1]) and _is_date(row[2])]
+    if not rows:
+        return []
+    holidays = None
+    if calendar is not None:
+        holidays = calendar.holidays_between(datetime.strptime(min(row[1] for row in rows), '%Y-%m-%d').date(),
+                                             datetime.strptime(max(row[2] for row in rows), '%Y-%m-%d').date())
+    counts = mission_day_counts([row[1] for row in rows], [row[2] for row in rows], holidays)
+    changes = []
+    for row, duration, nights, weekends in zip(rows, *(column.tolist() for column in counts)):
+        if tuple(row[3:6]) != (duration, nights, weekends):
+            changes.append((row[0], tuple(row[3:6]), (duration, nights, weekends)))
+    if dry_run or not changes:
+        return changes
+    try:
+        cursor.executemany("UPDATE missions SET duration=?, nights=?, weekends=? WHERE id=?",
+                           [wanted + (mission_id,) for mission_id, found, wanted in changes])
+        conn.commit()
+        events.publish("mission", None, events.UPDATE)
+    except sqlite3.Error as e:
+        logger.error(f"Erreur lors du recalcul des missions : {e}")
+        conn.rollback()
+        raise
+    return changes
+
+def _is_date(value):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+        return True
+    except (TypeError, ValueError):
+        return False
+
 def list_missions(db_file, driver_id=None):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     if driver_id:
         cursor.execute("SELECT * FROM missions WHERE driver_id=?", (driver_id,))
@@ -352,9 +1137,38 @@ def list_missions(db_file, driver_id=None):
         cursor.execute("SELECT * FROM missions")
     return cursor.fetchall()
 
+def list_missions_with_driver(db_file, driver_id=None, limit=None, offset=0, order_by=None, descending=False):
+    # Missions prêtes à afficher : "Nom Prénom" remplace driver_id
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    query, params = _missions_with_driver_query(driver_id, order_by, descending)
+    cursor.execute(*_paginate(query, params, limit, offset))
+    return cursor.fetchall()
+
+def _missions_with_driver_query(driver_id=None, order_by=None, descending=False):
+    query = _MISSIONS_WITH_DRIVER_SELECT
+    params = ()
+    if driver_id:
+        query += " WHERE m.driver_id=?"
+        params = (driver_id,)
+    return query + _order_by(MISSION_SORT_COLUMNS, order_by, descending, "m.id"), params
+
+def search_missions(db_file, query, driver_id=None, limit=None, offset=0, order_by=None, descending=False):
+    # Recherche dans les destinations, même format de ligne que list_missions_with_driver
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    where, params = _search_filter(db_file, "missions_fts", query, ("m.destination",), "m.id")
+    query = _MISSIONS_WITH_DRIVER_SELECT + f" WHERE {where}"
+    if driver_id:
+        query += " AND m.driver_id=?"
+        params += (driver_id,)
+    query += _order_by(MISSION_SORT_COLUMNS, order_by, descending, "m.id")
+    cursor.execute(*_paginate(query, params, limit, offset))
+    return cursor.fetchall()
+
 # --- Fonctions pour l'affectation véhicule-conducteur ---
 def assign_vehicle_to_driver(db_file, vehicle_id, driver_id, assignment_date):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("""
@@ -362,8 +1176,12 @@ def assign_vehicle_to_driver(db_file, vehicle_id, driver_id, assignment_date):
             VALUES (?, ?, ?)
         """, (vehicle_id, driver_id, assignment_date))
         conn.commit()
+        events.publish("assignment", cursor.lastrowid, events.INSERT)
         return cursor.lastrowid
-    except sqlite3.IntegrityError:
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        if "FOREIGN KEY" in str(e):
+            raise ValueError("Le véhicule ou le conducteur choisi n'existe pas ou plus.")
         raise ValueError("Ce véhicule est déjà affecté à ce conducteur.")
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de l'affectation du véhicule : {e}")
@@ -371,24 +1189,27 @@ def assign_vehicle_to_driver(db_file, vehicle_id, driver_id, assignment_date):
         raise
 
 def get_assignment(db_file, assignment_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM vehicle_assignments WHERE id=?", (assignment_id,))
     return cursor.fetchone()
 
-def list_assignments(db_file):
-    conn = sqlite3.connect(db_file)
+def list_assignments(db_file, limit=None, offset=0, order_by=None, descending=False):
+    conn = get_connection(db_file)
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT va.id, v.registration, d.name, d.surname, va.assignment_date
-        FROM vehicle_assignments va
-        JOIN vehicles v ON va.vehicle_id = v.id
-        JOIN drivers d ON va.driver_id = d.id
-    """)
+    cursor.execute(*_paginate(_ASSIGNMENTS_SELECT + _order_by(ASSIGNMENT_SORT_COLUMNS, order_by, descending, "va.id"),
+                              (), limit, offset))
+    return cursor.fetchall()
+
+def recent_assignments(db_file, limit=5):
+    # Les limit affectations les plus récentes, lues à rebours sur idx_assignments_date
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute(_ASSIGNMENTS_SELECT + " ORDER BY va.assignment_date DESC, va.id DESC LIMIT ?", (limit,))
     return cursor.fetchall()
 
 def get_vehicle_assignments(db_file, vehicle_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT va.id, d.name, d.surname, va.assignment_date
@@ -399,7 +1220,7 @@ def get_vehicle_assignments(db_file, vehicle_id):
     return cursor.fetchall()
 
 def get_driver_assignments(db_file, driver_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT va.id, v.registration, va.assignment_date
@@ -410,61 +1231,90 @@ def get_driver_assignments(db_file, driver_id):
     return cursor.fetchall()
 
 def delete_assignment(db_file, assignment_id):
-    conn = sqlite3.connect(db_file)
+    conn = get_connection(db_file)
     cursor = conn.cursor()
     try:
         cursor.execute("DELETE FROM vehicle_assignments WHERE id=?", (assignment_id,))
         conn.commit()
+        events.publish("assignment", assignment_id, events.DELETE)
     except sqlite3.Error as e:
         logger.error(f"Erreur lors de la suppression de l'affectation : {e}")
         conn.rollback()
         raise
 
-# --- Fonctions pour les alertes ---
-def check_vehicle_alerts(db_file):
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    today = datetime.now().strftime('%Y-%m-%d')
-    alerts = []
+# --- Lectures typées ---
+# Variantes des list_* renvoyant des objets de models.py au lieu de tuples :
+# le row_factory construit chaque objet directement depuis le curseur et les
+# colonnes lues sont celles déclarées dans les __slots__ du modèle.
+def _fetch_records(db_file, model, table, where="", params=()):
+    cursor = get_connection(db_file).cursor()
+    cursor.row_factory = row_factory(model)
+    cursor.execute(f"SELECT {', '.join(model.__slots__)} FROM {table}{where} ORDER BY id", params)
+    return cursor.fetchall()
 
-    cursor.execute("SELECT id, registration, revision_date FROM vehicles WHERE revision_date IS NOT NULL AND revision_date <= date(?, '+30 days')", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Révision à prévoir", "vehicle_id": row[0], "registration": row[1], "date": row[2]})
+def list_vehicle_records(db_file):
+    return _fetch_records(db_file, Vehicle, "vehicles")
 
-    cursor.execute("SELECT id, registration, control_date FROM vehicles WHERE control_date IS NOT NULL AND control_date <= date(?, '+30 days')", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Contrôle technique à prévoir", "vehicle_id": row[0], "registration": row[1], "date": row[2]})
+def list_driver_records(db_file):
+    return _fetch_records(db_file, Driver, "drivers")
 
-    cursor.execute("SELECT id, registration, revision_date FROM vehicles WHERE revision_date IS NOT NULL AND revision_date < ?", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Révision dépassée", "vehicle_id": row[0], "registration": row[1], "date": row[2]})
+def list_expense_records(db_file, vehicle_id=None):
+    if vehicle_id:
+        return _fetch_records(db_file, Expense, "expenses", " WHERE vehicle_id=?", (vehicle_id,))
+    return _fetch_records(db_file, Expense, "expenses")
 
-    cursor.execute("SELECT id, registration, control_date FROM vehicles WHERE control_date IS NOT NULL AND control_date < ?", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Contrôle technique dépassé", "vehicle_id": row[0], "registration": row[1], "date": row[2]})
+def list_mission_records(db_file, driver_id=None):
+    if driver_id:
+        return _fetch_records(db_file, Mission, "missions", " WHERE driver_id=?", (driver_id,))
+    return _fetch_records(db_file, Mission, "missions")
 
-    return alerts
+def list_assignment_records(db_file):
+    return _fetch_records(db_file, VehicleAssignment, "vehicle_assignments")
 
-def check_driver_alerts(db_file):
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    today = datetime.now().strftime('%Y-%m-%d')
-    alerts = []
+# --- Fonctions pour les alertes ---
+def get_dashboard_snapshot(db_file):
+    """Chiffres de l'aperçu du tableau de bord, en une seule requête.
 
-    cursor.execute("SELECT id, name, surname, expiry_date FROM drivers WHERE expiry_date IS NOT NULL AND expiry_date <= date(?, '+30 days')", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Permis expire bientôt", "driver_id": row[0], "name": f"{row[1]} {row[2]}", "date": row[3]})
+    Les totaux viennent des agrégats des dépenses : le coût ne dépend pas
+    de la taille des tables.
+    """
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT (SELECT COUNT(*) FROM vehicles),
+               (SELECT COUNT(*) FROM drivers),
+               (SELECT COALESCE(SUM(total), 0.0) FROM expense_totals_by_type),
+               (SELECT COALESCE(SUM(count), 0) FROM expense_totals_by_type)
+    """)
+    total_vehicles, total_drivers, total_expenses, expense_count = cursor.fetchone()
+    return {
+        "total_vehicles": total_vehicles,
+        "total_drivers": total_drivers,
+        "total_expenses": total_expenses,
+        "expense_count": expense_count,
+    }
 
-    cursor.execute("SELECT id, name, surname, expiry_date FROM drivers WHERE expiry_date IS NOT NULL AND expiry_date < ?", (today,))
-    for row in cursor.fetchall():
-        alerts.append({"type": "Permis expiré", "driver_id": row[0], "name": f"{row[1]} {row[2]}", "date": row[3]})
+def check_vehicle_alerts(db_file):
+    # Voir database.alerts : une alerte par échéance, avec sa sévérité
+    return [{"type": alert.type, "severity": alert.severity, "vehicle_id": alert.entity_id,
+             "registration": alert.label, "date": alert.date}
+            for alert in alerts.vehicle_alerts(db_file)]
 
-    return alerts
+def check_driver_alerts(db_file):
+    return [{"type": alert.type, "severity": alert.severity, "driver_id": alert.entity_id,
+             "name": alert.label, "date": alert.date}
+            for alert in alerts.driver_alerts(db_file)]
 
 def backup_database(db_file, backup_path):
-    import shutil
+    # L'API de sauvegarde SQLite inclut les pages encore dans le journal WAL,
+    # contrairement à une simple copie du fichier.
     try:
-        shutil.copy2(db_file, backup_path)
+        conn = get_connection(db_file)
+        backup_conn = sqlite3.connect(backup_path)
+        try:
+            conn.backup(backup_conn)
+        finally:
+            backup_conn.close()
         logger.info(f"Base de données sauvegardée vers : {backup_path}")
         return True
     except Exception as e:
@@ -472,9 +1322,14 @@ def backup_database(db_file, backup_path):
         return False
 
 def restore_database(backup_path, db_file):
-    import shutil
     try:
-        shutil.copy2(backup_path, db_file)
+        backup_conn = sqlite3.connect(backup_path)
+        try:
+            backup_conn.backup(get_connection(db_file))
+        finally:
+            backup_conn.close()
+        # Les connexions des autres threads rouvriront la base restaurée
+        close_all_connections(db_file)
         logger.info(f"Base de données restaurée depuis : {backup_path}")
         return True
     except Exception as e:
@@ -511,8 +1366,8 @@ if __name__ == '__main__':
     assignments = list_assignments(db_file)
     print("Liste des affectations :", assignments)
 
-    alerts = check_vehicle_alerts(db_file)
-    print("Alertes véhicules :", alerts)
+    vehicle_alerts = check_vehicle_alerts(db_file)
+    print("Alertes véhicules :", vehicle_alerts)
     driver_alerts = check_driver_alerts(db_file)
     print("Alertes conducteurs :", driver_alerts)
 
@@ -0,0 +1,197 @@
+import xlrd
+import logging
+from utils.validation_utils import validate_date
+import db_utils as root_database
+
+logger = logging.getLogger(__name__)
+
+# Pipeline d'importation Excel par générateurs :
+#   lecture des lignes -> analyse/validation -> résolution des clés étrangères
+#   -> insertion par lots.
+# xlrd charge la feuille entière en mémoire ; les lignes converties, elles,
+# ne sont gardées que pour le lot en cours. Chaque lot est validé (commit)
+# séparément et les lignes refusées sont consignées dans un ImportReport au
+# lieu d'interrompre l'importation.
+
+DEFAULT_CHUNK_SIZE = 1000
+
+class ImportReport:
+    def __init__(self, total=0):
+        self.total = total
+        self.read = 0
+        self.inserted = 0
+        self.rejected = []  # (numéro de ligne Excel, raison)
+
+    def reject(self, row_number, reason):
+        self.rejected.append((row_number, reason))
+
+# --- Conversion des cellules ---
+def _text(value):
+    # xlrd renvoie les nombres en float : "123456789.0" doit rester "123456789"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _required_text(value, label):
+    text = _text(value)
+    if not text:
+        raise ValueError(f"{label} manquant(e)")
+    return text
+
+def _int(value, label):
+    if isinstance(value, str):
+        value = value.strip()
+    if value in ("", None):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{label} invalide : {value}")
+    if not number.is_integer():
+        raise ValueError(f"{label} doit être un nombre entier : {value}")
+    return int(number)
+
+def _float(value, label):
+    if isinstance(value, str):
+        value = value.strip()
+    if value in ("", None):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{label} invalide : {value}")
+
+def _date(value, datemode, label, required=True):
+    if value in ("", None):
+        if required:
+            raise ValueError(f"{label} manquant(e)")
+        return None
+    if isinstance(value, float):
+        # Cellule au format date Excel
+        return xlrd.xldate.xldate_as_datetime(value, datemode).strftime('%Y-%m-%d')
+    text = _text(value)
+    if not validate_date(text):
+        raise ValueError(f"{label} invalide (AAAA-MM-JJ) : {text}")
+    return text
+
+# --- Analyse des lignes, une fonction par entité ---
+# La première valeur renvoyée est la clé à résoudre (immatriculation, nom du
+# conducteur) ou directement la première colonne à insérer.
+def parse_vehicle_row(row, datemode):
+    # Colonnes : registration, make, model, year, revision_date, control_date
+    return (_required_text(row[0], "Immatriculation"), _required_text(row[1], "Marque"),
+            _required_text(row[2], "Modèle"), _int(row[3], "Année"),
+            _date(row[4], datemode, "Date de révision", required=False),
+            _date(row[5], datemode, "Date de contrôle", required=False))
+
+def parse_driver_row(row, datemode):
+    # Colonnes : name, surname, license_number, expiry_date
+    return (_required_text(row[0], "Nom"), _required_text(row[1], "Prénom"),
+            _required_text(row[2], "Numéro de permis"),
+            _date(row[3], datemode, "Date d'expiration", required=False))
+
+def parse_expense_row(row, datemode):
+    # Colonnes : vehicle_reg, date, type, amount, description, mileage, liters
+    amount = _float(row[3], "Montant")
+    if amount is None:
+        raise ValueError("Montant manquant")
+    return (_required_text(row[0], "Immatriculation"), _date(row[1], datemode, "Date"),
+            _required_text(row[2], "Type"), amount, _text(row[4]),
+            _int(row[5], "Kilométrage"), _float(row[6], "Litres"))
+
+def parse_mission_row(row, datemode):
+    # Colonnes : driver_name, start_date, end_date, destination, duration, meals, nights, weekends
+    start_date = _date(row[1], datemode, "Date de début")
+    end_date = _date(row[2], datemode, "Date de fin")
+    if end_date < start_date:
+        raise ValueError("La date de fin précède la date de début")
+    weekends = _int(row[7], "Week-ends")
+    return (_required_text(row[0], "Conducteur"), start_date, end_date,
+            _required_text(row[3], "Destination"), _int(row[4], "Durée"),
+            _int(row[5], "Repas"), _int(row[6], "Nuitées"), weekends if weekends is not None else 0)
+
+# --- Étapes du pipeline ---
+def read_rows(sheet, report, first_row=1):
+    for row_idx in range(first_row, sheet.nrows):
+        report.read += 1
+        yield row_idx + 1, sheet.row_values(row_idx)
+
+def parse_rows(rows, parser, datemode, report):
+    for row_number, row in rows:
+        try:
+            yield row_number, parser(row, datemode)
+        except IndexError:
+            report.reject(row_number, "Colonnes manquantes")
+        except ValueError as e:
+            report.reject(row_number, str(e))
+
+def resolve_rows(records, lookup, label, report):
+    # Remplace la clé en tête de ligne par l'ID trouvé dans lookup (dict)
+    for row_number, record in records:
+        key_id = lookup.get(record[0])
+        if key_id is None:
+            report.reject(row_number, f"{label} inconnu(e) : {record[0]}")
+            continue
+        yield row_number, (key_id,) + record[1:]
+
+def _chunks(records, chunk_size):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _insert_chunk(db_file, chunk, insert_bulk, report):
+    try:
+        report.inserted += insert_bulk(db_file, [record for _, record in chunk])
+    except ValueError as e:
+        # Un doublon fait échouer tout le lot : on le coupe en deux et on
+        # rejoue chaque moitié, jusqu'à isoler les lignes fautives (quelques
+        # transactions par ligne refusée au lieu d'une par ligne du lot).
+        if len(chunk) == 1:
+            report.reject(chunk[0][0], str(e))
+            return
+        middle = len(chunk) // 2
+        _insert_chunk(db_file, chunk[:middle], insert_bulk, report)
+        _insert_chunk(db_file, chunk[middle:], insert_bulk, report)
+
+def insert_chunks(db_file, records, insert_bulk, report, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    for chunk in _chunks(records, chunk_size):
+        _insert_chunk(db_file, chunk, insert_bulk, report)
+        if progress:
+            progress(report.read, report.total)
+    if progress:
+        progress(report.read, report.total)
+    return report
+
+def _run(db_file, workbook, parser, insert_bulk, lookup=None, lookup_label=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    sheet = workbook.sheet_by_index(0)
+    report = ImportReport(total=max(sheet.nrows - 1, 0))
+    records = parse_rows(read_rows(sheet, report), parser, workbook.datemode, report)
+    if lookup is not None:
+        records = resolve_rows(records, lookup, lookup_label, report)
+    insert_chunks(db_file, records, insert_bulk, report, chunk_size, progress)
+    logger.info(f"Importation terminée : {report.inserted} ligne(s) insérée(s), {len(report.rejected)} refusée(s).")
+    return report
+
+# --- Points d'entrée ---
+def import_vehicles(db_file, workbook, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    return _run(db_file, workbook, parse_vehicle_row, root_database.add_vehicles_bulk,
+                chunk_size=chunk_size, progress=progress)
+
+def import_drivers(db_file, workbook, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    return _run(db_file, workbook, parse_driver_row, root_database.add_drivers_bulk,
+                chunk_size=chunk_size, progress=progress)
+
+def import_expenses(db_file, workbook, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    return _run(db_file, workbook, parse_expense_row, root_database.add_expenses_bulk,
+                lookup=root_database.get_vehicle_ids_by_registration(db_file), lookup_label="Véhicule",
+                chunk_size=chunk_size, progress=progress)
+
+def import_missions(db_file, workbook, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    return _run(db_file, workbook, parse_mission_row, root_database.add_missions_bulk,
+                lookup=root_database.get_driver_ids_by_name(db_file), lookup_label="Conducteur",
+                chunk_size=chunk_size, progress=progress)
@@ -1,6 +1,16 @@
+import sys
+
+profiler = None
+if __name__ == "__main__" and "--profile-startup" in sys.argv[1:]:
+    # Affiche sur la sortie d'erreur le temps de chaque import et des
+    # étapes du démarrage, une fois la fenêtre affichée. Installé avant
+    # tout autre import pour mesurer aussi tkinter et la journalisation.
+    from utils.startup_profiler import StartupProfiler
+    profiler = StartupProfiler()
+    profiler.install()
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-from ui.main_window import MainWindow
 from utils.error_logger import setup_logger
 import logging
 import json
@@ -9,6 +19,26 @@ import os
 APP_NAME = "Gestion de Flotte"
 VERSION = "1.0"
 DATABASE_FILE = "fleet_data.db"
+# Profil SQLite appliqué à chaque connexion (voir database/connection.py).
+# WAL permet aux lectures du tableau de bord de ne pas bloquer les saisies.
+DATABASE_SETTINGS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,  # octets
+    "cache_size": -64 * 1024,  # négatif : taille en Kio
+    "temp_store": "MEMORY",
+    "foreign_keys": True,
+}
+# Nombre de jours avant l'échéance à partir duquel une alerte est affichée
+# (voir database/alerts.py)
+ALERT_HORIZONS = {
+    "vehicle_revision": 30,
+    "vehicle_control": 30,
+    "driver_license": 30,
+}
+# Jours fériés comptés avec les week-ends des missions (fichier de
+# utils/holiday_data, None pour aucun)
+HOLIDAY_CALENDAR = "FR"
 LOG_FILE = "app.log"
 LANG_DIR = "lang"
 DEFAULT_LANG = "fr"
@@ -16,7 +46,7 @@ DEFAULT_LANG = "fr"
 logger = setup_logger(LOG_FILE)
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
         self.title(APP_NAME)
         self.geometry("1200x700")
@@ -26,13 +56,32 @@ class App(tk.Tk):
         self.database_file = DATABASE_FILE
 
         import db_utils as root_database
+        from database.connection import configure
+        configure(DATABASE_SETTINGS)
+        from database import alerts
+        alerts.configure(ALERT_HORIZONS)
+        from utils import holidays
+        holidays.configure(HOLIDAY_CALENDAR)
         root_database.create_tables(self.database_file)
 
+        # Importé ici : les modules lourds (exports, graphiques, fenêtres de
+        # gestion) ne sont chargés qu'à leur première utilisation.
+        from ui.main_window import MainWindow
         self.main_window = MainWindow(self, self.database_file, self.lang, self.switch_language)
         self.config(menu=self.create_menu())
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        if profiler is not None:
+            profiler.mark("fenêtre principale construite")
+            self.after_idle(self.report_startup, profiler)
+
+    def report_startup(self, profiler):
+        # Premier passage à vide de la boucle Tk : la fenêtre est affichée
+        profiler.mark("fenêtre affichée")
+        profiler.uninstall()
+        profiler.report()
+
     def load_language(self, lang_code):
         try:
             # Corrected path to the language files within the "translations" subdirectory
@@ -66,7 +115,7 @@ class App(tk.Tk):
         file_menu.add_command(label=self.lang.get("menu_file_backup", "Sauvegarder"), command=self.main_window.backup_database)
         file_menu.add_command(label=self.lang.get("menu_file_restore", "Restaurer"), command=self.main_window.restore_database)
         file_menu.add_separator()
-        file_menu.add_command(label=self.lang.get("menu_file_exit", "Quitter"), command=self.quit)
+        file_menu.add_command(label=self.lang.get("menu_file_exit", "Quitter"), command=self.on_closing)
         menubar.add_cascade(label=self.lang.get("menu_file", "Fichier"), menu=file_menu)
 
         # Menu Affichage
@@ -87,7 +136,17 @@ class App(tk.Tk):
     def on_closing(self):
         if messagebox.askokcancel(self.lang.get("dialog_quit_title", "Quitter"), self.lang.get("dialog_quit_message", "Voulez-vous vraiment quitter l'application ?")):
             self.destroy()
+            from ui import task_runner
+            from database.connection import close_all_connections
+            # La fenêtre détruite, les tâches en cours s'interrompent au prochain
+            # point de contrôle : attendre leur fin avant de fermer les connexions
+            task_runner.shutdown(wait=True)
+            close_all_connections()
 
 if __name__ == "__main__":
-    app = App()
+    # Les processus d'export (reporting.export_job) relancent l'exécutable
+    # une fois l'application empaquetée
+    import multiprocessing
+    multiprocessing.freeze_support()
+    app = App(profiler)
     app.mainloop()
\ No newline at end of file
@@ -1,64 +1,97 @@
-from datetime import datetime
+from datetime import date
+
+def _parse_date(date_str):
+    # Dates stockées au format ISO AAAA-MM-JJ. Une date mal formée donne
+    # None, comme une date absente : une seule ligne invalide ne doit pas
+    # empêcher de charger toute la table (voir aussi _is_date dans db_utils)
+    if not date_str:
+        return None
+    try:
+        return date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+
+class _Record:
+    # __slots__ dans chaque modèle : pas de __dict__ par instance, ce qui
+    # divise la mémoire par plusieurs quand on charge toute une table.
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+class Vehicle(_Record):
+    __slots__ = ("id", "registration", "make", "model", "year", "revision_date", "control_date")
 
-class Vehicle:
     def __init__(self, id=None, registration=None, make=None, model=None, year=None, revision_date=None, control_date=None):
         self.id = id
         self.registration = registration
         self.make = make
         self.model = model
         self.year = year
-        self.revision_date = self._parse_date(revision_date)
-        self.control_date = self._parse_date(control_date)
+        self.revision_date = _parse_date(revision_date)
+        self.control_date = _parse_date(control_date)
 
-    def _parse_date(self, date_str):
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+class Driver(_Record):
+    __slots__ = ("id", "name", "surname", "license_number", "expiry_date")
 
-class Driver:
     def __init__(self, id=None, name=None, surname=None, license_number=None, expiry_date=None):
         self.id = id
         self.name = name
         self.surname = surname
         self.license_number = license_number
-        self.expiry_date = self._parse_date(expiry_date)
+        self.expiry_date = _parse_date(expiry_date)
 
-    def _parse_date(self, date_str):
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+class Expense(_Record):
+    __slots__ = ("id", "vehicle_id", "date", "type", "amount", "description", "mileage", "liters")
 
-class Expense:
     def __init__(self, id=None, vehicle_id=None, date=None, type=None, amount=None, description=None, mileage=None, liters=None):
         self.id = id
         self.vehicle_id = vehicle_id
-        self.date = self._parse_date(date)
+        self.date = _parse_date(date)
         self.type = type
         self.amount = amount
         self.description = description
         self.mileage = mileage
         self.liters = liters
 
-    def _parse_date(self, date_str):
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+class Mission(_Record):
+    __slots__ = ("id", "driver_id", "start_date", "end_date", "destination", "duration", "meals", "nights", "weekends")
 
-class Mission:
     def __init__(self, id=None, driver_id=None, start_date=None, end_date=None, destination=None, duration=None, meals=None, nights=None, weekends=None):
         self.id = id
         self.driver_id = driver_id
-        self.start_date = self._parse_date(start_date)
-        self.end_date = self._parse_date(end_date)
+        self.start_date = _parse_date(start_date)
+        self.end_date = _parse_date(end_date)
         self.destination = destination
         self.duration = duration
         self.meals = meals
         self.nights = nights
         self.weekends = weekends
 
-    def _parse_date(self, date_str):
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+class VehicleAssignment(_Record):
+    __slots__ = ("id", "vehicle_id", "driver_id", "assignment_date")
 
-class VehicleAssignment:
     def __init__(self, id=None, vehicle_id=None, driver_id=None, assignment_date=None):
         self.id = id
         self.vehicle_id = vehicle_id
         self.driver_id = driver_id
-        self.assignment_date = self._parse_date(assignment_date)
+        self.assignment_date = _parse_date(assignment_date)
+
+def row_factory(model):
+    """row_factory sqlite3 construisant directement des instances de model.
 
-    def _parse_date(self, date_str):
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
\ No newline at end of file
+    Les colonnes de la requête doivent suivre l'ordre des paramètres du
+    constructeur, c'est-à-dire celui de model.__slots__ (voir
+    db_utils._fetch_records).
+    """
+    def factory(cursor, row):
+        return model(*row)
+    return factory
@@ -0,0 +1,263 @@
+import logging
+import threading
+import numpy as np
+from database import events
+from database.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots lus lors d'un chargement
+LOAD_BATCH_SIZE = 50000
+
+# Jour des dates absentes ou invalides (jours depuis le 1970-01-01) : exclu
+# de tout filtre de période et de tout regroupement temporel
+MISSING_DAY = np.iinfo(np.int32).min
+
+# Regroupements possibles : colonne, ou découpage temporel de la date
+GROUP_KEYS = ("vehicle_id", "type", "day", "week", "month", "year")
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+
+_COLUMNS = ("id", "vehicle_id", "day", "amount", "mileage", "liters", "type_code")
+
+def _to_days(dates):
+    # Texte AAAA-MM-JJ -> jours depuis le 1970-01-01 ; conversion vectorisée,
+    # puis valeur par valeur si le lot contient une date invalide
+    try:
+        days = np.array(dates, dtype="datetime64[D]")
+    except ValueError:
+        days = np.empty(len(dates), dtype="datetime64[D]")
+        for i, value in enumerate(dates):
+            try:
+                days[i] = np.datetime64(value, "D")
+            except ValueError:
+                days[i] = np.datetime64("NaT")
+    result = days.astype(np.int64)
+    result[np.isnat(days)] = MISSING_DAY
+    return result.astype(np.int32)
+
+def _day(value):
+    day = _to_days([value])[0]
+    if day == MISSING_DAY:
+        raise ValueError(f"Date invalide : {value}")
+    return day
+
+def _bucket_label(key, value):
+    if value == MISSING_DAY:
+        return None
+    if key in ("day", "week"):
+        return str(np.datetime64(int(value), "D"))
+    if key == "month":
+        return str(np.datetime64(int(value), "M"))
+    return str(1970 + int(value))
+
+class ExpenseFrame:
+    """Les dépenses en colonnes NumPy, pour les analyses en mémoire.
+
+    Une colonne par champ : id, vehicle_id (0 si absent), day (jours depuis
+    le 1970-01-01), amount, mileage et liters (NaN si absents) et type_code,
+    indice du type dans self.types (codage par dictionnaire). Les filtres
+    et regroupements travaillent sur ces tableaux sans repasser par SQLite.
+
+    refresh() ne lit que les dépenses d'id supérieur au dernier chargé ; une
+    modification ou une suppression (signalée par le bus des modifications)
+    provoque un rechargement complet au refresh() suivant. Les colonnes
+    sont remplacées par refresh() : l'appeler depuis le thread qui lit.
+    """
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.types = []
+        self._type_codes = {}
+        self._lock = threading.Lock()
+        self._stale = False
+        self._clear()
+        events.subscribe(self._on_change, ("expense",))
+
+    def _clear(self):
+        self.id = np.empty(0, dtype=np.int64)
+        self.vehicle_id = np.empty(0, dtype=np.int64)
+        self.day = np.empty(0, dtype=np.int32)
+        self.amount = np.empty(0, dtype=np.float64)
+        self.mileage = np.empty(0, dtype=np.float64)
+        self.liters = np.empty(0, dtype=np.float64)
+        self.type_code = np.empty(0, dtype=np.int32)
+        self.types = []
+        self._type_codes = {}
+        self.last_seen = 0
+
+    def __len__(self):
+        return len(self.id)
+
+    def invalidate(self):
+        """Force un rechargement complet (base restaurée, modification hors db_utils)."""
+        self._stale = True
+
+    def close(self):
+        events.unsubscribe(self._on_change)
+
+    def _on_change(self, event):
+        # Les ajouts sont repris par id > last_seen ; le reste invalide les colonnes
+        if event.operation != events.INSERT:
+            self.invalidate()
+
+    def refresh(self):
+        """Charge les nouvelles dépenses ; renvoie le nombre de lignes lues."""
+        with self._lock:
+            if self._stale:
+                self._stale = False
+                self._clear()
+            cursor = get_connection(self.db_file).cursor()
+            cursor.execute("""
+                SELECT id, vehicle_id, date, amount, mileage, liters, type
+                FROM expenses WHERE id > ? ORDER BY id
+            """, (self.last_seen,))
+            batches = []
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not rows:
+                    break
+                batches.append(self._columns(rows))
+            if not batches:
+                return 0
+            for name, parts in zip(_COLUMNS, zip(*batches)):
+                setattr(self, name, np.concatenate((getattr(self, name),) + parts))
+            self.last_seen = int(self.id[-1])
+            loaded = sum(len(batch[0]) for batch in batches)
+            logger.info(f"Analyse des dépenses : {loaded} ligne(s) chargée(s), {len(self)} au total.")
+            return loaded
+
+    def _columns(self, rows):
+        ids, vehicle_ids, dates, amounts, mileages, liters, types = zip(*rows)
+        codes = self._type_codes
+        for value in set(types) - codes.keys():
+            codes[value] = len(self.types)
+            self.types.append(value)
+        return (np.array(ids, dtype=np.int64),
+                np.array([v or 0 for v in vehicle_ids], dtype=np.int64),
+                _to_days(dates),
+                np.array([a or 0.0 for a in amounts], dtype=np.float64),
+                # None -> NaN
+                np.array(mileages, dtype=np.float64),
+                np.array(liters, dtype=np.float64),
+                np.array([codes[t] for t in types], dtype=np.int32))
+
+    def mask(self, start_date=None, end_date=None, vehicle_ids=None, types=None):
+        """Lignes retenues (tableau booléen). Dates AAAA-MM-JJ, bornes incluses."""
+        keep = np.ones(len(self), dtype=bool)
+        if start_date:
+            keep &= self.day >= _day(start_date)
+        if end_date:
+            keep &= (self.day <= _day(end_date)) & (self.day != MISSING_DAY)
+        if vehicle_ids:
+            keep &= np.isin(self.vehicle_id, list(vehicle_ids))
+        if types:
+            codes = [self._type_codes[t] for t in types if t in self._type_codes]
+            keep &= np.isin(self.type_code, codes)
+        return keep
+
+    def bucket(self, key):
+        """Clé de regroupement par ligne (codes entiers)."""
+        if key == "vehicle_id":
+            return self.vehicle_id
+        if key == "type":
+            return self.type_code
+        if key not in GROUP_KEYS:
+            raise ValueError(f"Regroupement inconnu : {key}")
+        missing = self.day == MISSING_DAY
+        days = self.day.astype("datetime64[D]")
+        if key == "day":
+            return self.day
+        if key == "week":
+            # Lundi de la semaine ; le 1970-01-01 était un jeudi
+            buckets = self.day - (self.day.astype(np.int64) + 3) % 7
+        elif key == "month":
+            buckets = days.astype("datetime64[M]").astype(np.int32)
+        else:
+            buckets = days.astype("datetime64[Y]").astype(np.int32)
+        return np.where(missing, MISSING_DAY, buckets).astype(np.int32)
+
+    def group_by(self, keys, value="amount", how="sum", mask=None):
+        """Agrège value par combinaison de keys ; renvoie [(clé..., valeur)] trié.
+
+        keys : noms de GROUP_KEYS (type et dates rendus en texte). value est
+        une colonne numérique ; les NaN (kilométrage, litres absents) sont
+        ignorés. how parmi AGGREGATES.
+        """
+        if isinstance(keys, str):
+            keys = (keys,)
+        if how not in AGGREGATES:
+            raise ValueError(f"Agrégat inconnu : {how}")
+        values = getattr(self, value)
+        keep = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(len(self), dtype=bool)
+        if mask is not None:
+            keep &= mask
+        values = values[keep]
+        columns = [self.bucket(key)[keep] for key in keys]
+        if not len(values):
+            return []
+        # Indice de groupe de chaque ligne : chaque clé est réduite à ses
+        # valeurs distinctes, puis les indices sont combinés en un seul entier
+        uniques = []
+        inverse = np.zeros(len(values), dtype=np.int64)
+        for column in columns:
+            distinct, codes = np.unique(column, return_inverse=True)
+            uniques.append(distinct)
+            inverse = inverse * len(distinct) + codes.reshape(-1)
+        combined, inverse = np.unique(inverse, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = []
+        for distinct in reversed(uniques):
+            combined, index = np.divmod(combined, len(distinct))
+            groups.append(distinct[index])
+        groups = np.stack(groups[::-1], axis=1)
+        counts = np.bincount(inverse, minlength=len(groups))
+        if how == "count":
+            result = counts
+        elif how in ("sum", "mean"):
+            result = np.bincount(inverse, weights=values, minlength=len(groups))
+            if how == "mean":
+                result = result / counts
+        else:
+            # Tri par groupe puis réduction de chaque tranche
+            order = np.argsort(inverse, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            reduce = np.minimum if how == "min" else np.maximum
+            result = reduce.reduceat(values[order], starts)
+        rows = [tuple(self._label(key, code) for key, code in zip(keys, group)) + (result[i].item(),)
+                for i, group in enumerate(groups)]
+        # Tri sur les libellés (l'ordre des codes de type est celui de chargement) ;
+        # les dates absentes en dernier
+        return sorted(rows, key=lambda row: tuple((label is None, "" if label is None else label) for label in row[:-1]))
+
+    def _label(self, key, code):
+        if key == "vehicle_id":
+            return int(code)
+        if key == "type":
+            return self.types[code]
+        return _bucket_label(key, code)
+
+    def cost_per_km(self, mask=None):
+        """[(vehicle_id, coût total, km parcourus, coût au km)] par véhicule.
+
+        Les km parcourus sont l'écart entre le plus grand et le plus petit
+        kilométrage relevé ; le coût au km vaut None sans écart.
+        """
+        costs = dict((vehicle_id, total) for vehicle_id, total in self.group_by("vehicle_id", mask=mask))
+        lowest = dict(self.group_by("vehicle_id", "mileage", "min", mask))
+        highest = dict(self.group_by("vehicle_id", "mileage", "max", mask))
+        result = []
+        for vehicle_id, total in costs.items():
+            distance = highest.get(vehicle_id, 0.0) - lowest.get(vehicle_id, 0.0)
+            result.append((vehicle_id, total, distance, total / distance if distance > 0 else None))
+        return result
+
+_frames = {}
+_frames_lock = threading.Lock()
+
+def get_expense_frame(db_file):
+    """ExpenseFrame partagée de la base, à jour des derniers ajouts."""
+    with _frames_lock:
+        frame = _frames.get(db_file)
+        if frame is None:
+            frame = _frames[db_file] = ExpenseFrame(db_file)
+    frame.refresh()
+    return frame
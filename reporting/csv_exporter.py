@@ -0,0 +1,41 @@
+import csv
+import os
+from reporting import queries
+
+# Séparateur et encodage attendus par Excel en français : ';' et UTF-8 avec BOM
+CSV_DELIMITER = ';'
+CSV_ENCODING = 'utf-8-sig'
+
+def section_path(filepath, title):
+    # rapport.csv -> rapport_Dépenses.csv
+    stem, ext = os.path.splitext(filepath)
+    return f"{stem}_{title}{ext or '.csv'}"
+
+def export_to_csv(filepath, db_file, lang, progress=None, report_filter=None, on_file=None):
+    """Exporte chaque section non vide dans son propre fichier CSV.
+
+    Les fichiers sont nommés d'après filepath (voir section_path) ; les
+    lignes sont lues et écrites en flux. on_file(chemin) est appelé avant
+    la création de chaque fichier. Renvoie la liste des fichiers créés.
+    """
+    counter = queries.ProgressCounter(db_file, report_filter, progress)
+    paths = []
+    for title, headers, rows in queries.tables(db_file, lang, report_filter):
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            continue
+        path = section_path(filepath, title)
+        if on_file:
+            on_file(path)
+        with open(path, 'w', newline='', encoding=CSV_ENCODING) as f:
+            writer = csv.writer(f, delimiter=CSV_DELIMITER)
+            writer.writerow(headers)
+            writer.writerow(first)
+            counter.step()
+            for row in rows:
+                writer.writerow(row)
+                counter.step()
+        paths.append(path)
+    counter.finish()
+    return paths
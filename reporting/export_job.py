@@ -0,0 +1,172 @@
+import os
+import queue
+import logging
+import tempfile
+import threading
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import db_utils as root_database
+
+logger = logging.getLogger(__name__)
+
+# Format -> (module, fonction). Chaque exporteur est appelé comme
+# exporter(fichier, base, lang, progress=..., report_filter=...) ; l'export
+# CSV, qui crée un fichier par section, reçoit aussi on_file=...
+EXPORTERS = {
+    "pdf": ("reporting.pdf_exporter", "export_to_pdf"),
+    "xlsx": ("reporting.excel_exporter", "export_to_excel"),
+    "csv": ("reporting.csv_exporter", "export_to_csv"),
+}
+
+# Intervalle de relève de la progression des processus (en secondes)
+POLL_INTERVAL = 0.1
+
+class ExportCancelled(Exception):
+    """Levée par ExportJob.run() (et dans les processus) après cancel()."""
+
+# État d'un processus du pool, transmis à sa création
+_progress_queue = None
+_cancel_event = None
+
+def _init_worker(progress_queue, cancel_event):
+    global _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+
+def _export_worker(fmt, filepath, snapshot_file, lang, report_filter):
+    # Exécuté dans un processus du pool : seul le module de l'exporteur est importé
+    module_name, function_name = EXPORTERS[fmt]
+    exporter = getattr(importlib.import_module(module_name), function_name)
+
+    def progress(done, total):
+        # Point de contrôle de l'annulation
+        if _cancel_event.is_set():
+            raise ExportCancelled()
+        _progress_queue.put(("progress", fmt, done, total))
+
+    def on_file(path):
+        # Fichier bientôt créé, à supprimer si l'export n'aboutit pas
+        _progress_queue.put(("file", fmt, path))
+
+    options = {"on_file": on_file} if fmt == "csv" else {}
+    result = exporter(filepath, snapshot_file, lang, progress=progress, report_filter=report_filter, **options)
+    # L'export CSV crée un fichier par section et renvoie leur liste
+    return result if isinstance(result, list) else [filepath]
+
+class ExportJob:
+    """Génère plusieurs formats d'un même rapport en parallèle.
+
+    La base est d'abord copiée une seule fois (API de sauvegarde SQLite) :
+    tous les formats partent du même instantané, même si la base est
+    modifiée pendant l'export. Chaque format est ensuite produit dans son
+    propre processus, la mise en page PDF et l'encodage XLSX occupant
+    chacun un cœur.
+
+    outputs associe un format de EXPORTERS au fichier à produire. run() est
+    bloquant (à lancer hors du thread Tk) ; cancel() peut être appelé depuis
+    n'importe quel thread.
+    """
+    def __init__(self, db_file, lang, outputs, report_filter=None, max_workers=None):
+        unknown = set(outputs) - set(EXPORTERS)
+        if unknown:
+            raise ValueError(f"Formats d'export inconnus : {', '.join(sorted(unknown))}")
+        self.db_file = db_file
+        self.lang = dict(lang)
+        self.outputs = dict(outputs)
+        self.report_filter = report_filter
+        self.max_workers = max_workers or min(len(self.outputs), os.cpu_count() or 1)
+        self._cancelled = threading.Event()
+        self._cancel_event = None
+        # Format -> fichiers écrits, à supprimer si le format n'aboutit pas ;
+        # les fichiers CSV sont annoncés par les processus au fil de l'export
+        self._files = {fmt: [filepath] for fmt, filepath in self.outputs.items() if fmt != "csv"}
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def run(self, progress=None):
+        """Produit les fichiers ; renvoie {format: [fichiers créés]}.
+
+        progress(lignes, total) cumule la progression de tous les formats.
+        Lève ExportCancelled si l'export a été annulé.
+        """
+        fd, snapshot_file = tempfile.mkstemp(prefix="fleet-export-", suffix=".db")
+        os.close(fd)
+        # spawn plutôt que fork : le processus principal a des threads et Tk
+        context = multiprocessing.get_context("spawn")
+        progress_queue = context.Queue()
+        self._cancel_event = context.Event()
+        if self._cancelled.is_set():
+            self._cancel_event.set()
+        executor = None
+        results = {}
+        try:
+            if not root_database.backup_database(self.db_file, snapshot_file):
+                raise RuntimeError("Impossible de copier la base de données pour l'export.")
+            executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                           initializer=_init_worker, initargs=(progress_queue, self._cancel_event))
+            pending = {executor.submit(_export_worker, fmt, filepath, snapshot_file, self.lang, self.report_filter): fmt
+                       for fmt, filepath in self.outputs.items()}
+            states = {fmt: (0, 0) for fmt in self.outputs}
+            while pending:
+                done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                changed = False
+                for fmt, rows, total in self._read_queue(progress_queue):
+                    states[fmt] = (rows, total)
+                    changed = True
+                for future in done:
+                    fmt = pending.pop(future)
+                    # Une erreur dans un format interrompt les autres
+                    results[fmt] = future.result()
+                if self._cancelled.is_set():
+                    raise ExportCancelled()
+                if progress and changed:
+                    progress(sum(rows for rows, total in states.values()),
+                             sum(total for rows, total in states.values()))
+            return results
+        except BaseException:
+            self.cancel()
+            raise
+        finally:
+            if executor is not None:
+                # Attendre la fin des processus avant de supprimer leurs fichiers
+                executor.shutdown(wait=True, cancel_futures=True)
+            # Fichiers annoncés depuis la dernière relève
+            for _ in self._read_queue(progress_queue):
+                pass
+            progress_queue.close()
+            if len(results) < len(self.outputs):
+                self._remove_unfinished(results)
+            for path in (snapshot_file, snapshot_file + "-wal", snapshot_file + "-shm"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _read_queue(self, progress_queue):
+        # Vide la file : note les fichiers annoncés, génère (format, lignes, total)
+        while True:
+            try:
+                message = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            if message[0] == "file":
+                self._files.setdefault(message[1], []).append(message[2])
+            else:
+                yield message[1:]
+
+    def _remove_unfinished(self, results):
+        # Fichiers partiels des formats interrompus
+        for fmt in self.outputs:
+            if fmt in results:
+                continue
+            for path in self._files.get(fmt, []):
+                if not os.path.exists(path):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.error(f"Impossible de supprimer l'export incomplet {path} : {e}")
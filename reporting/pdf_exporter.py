@@ -2,113 +2,128 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
+from reporting import queries
 
-def export_to_pdf(filepath, vehicles, drivers, expenses, missions, assignments, lang, for_print=False):
+# Les lignes sont découpées en tables de ROWS_PER_TABLE lignes (en-tête
+# répété) : une table déjà mise en page peut être libérée avant que la
+# suivante soit construite.
+ROWS_PER_TABLE = 250
+
+# Style partagé par toutes les tables du rapport
+TABLE_STYLE = TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                          ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                          ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                          ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                          ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                          ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                          ('GRID', (0, 0), (-1, -1), 1, colors.black)])
+
+class StreamingStory(list):
+    """Liste de flowables remplie à la demande depuis un itérable.
+
+    SimpleDocTemplate.build() consomme la liste par le début : seuls
+    quelques flowables existent à la fois au lieu de tout le rapport.
+    """
+    def __init__(self, flowables, prefetch=2):
+        list.__init__(self)
+        self._source = iter(flowables)
+        self._prefetch = prefetch
+        self._fill()
+
+    def _fill(self):
+        # prefetch >= 2 : build() regarde le flowable suivant (keepWithNext)
+        while self._source is not None and list.__len__(self) < self._prefetch:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self._fill()
+
+def _section(title, headers, rows, empty_text, col_weights, styles, width, counter):
+    yield Paragraph(title, styles['h2'])
+    # Largeurs fixes : les tables d'une même section restent alignées et
+    # reportlab n'a pas à mesurer chaque cellule.
+    col_widths = [width * weight / sum(col_weights) for weight in col_weights]
+    chunk = []
+    empty = True
+    for row in rows:
+        chunk.append(row)
+        counter.step()
+        if len(chunk) == ROWS_PER_TABLE:
+            yield Table([headers] + chunk, colWidths=col_widths, repeatRows=1, style=TABLE_STYLE)
+            chunk = []
+            empty = False
+    if chunk:
+        yield Table([headers] + chunk, colWidths=col_widths, repeatRows=1, style=TABLE_STYLE)
+    elif empty:
+        yield Paragraph(empty_text, styles['Normal'])
+    yield Spacer(1, 12)
+
+def _text(value):
+    return "" if value is None else str(value)
+
+def _report(db_file, lang, styles, width, report_filter, counter):
+    unknown = lang.get("unknown", "Inconnu")
+    yield Paragraph(lang.get("report_title", "Rapport de Gestion de Flotte"), styles['h1'])
+    if report_filter.start_date or report_filter.end_date:
+        yield Paragraph(f"{lang.get('report_period', 'Période :')} {report_filter.start_date or '...'} - {report_filter.end_date or '...'}", styles['Normal'])
+    yield Spacer(1, 12)
+
+    yield from _section(
+        lang.get("report_vehicles", "Véhicules"),
+        [lang.get("registration", "Immatriculation"), lang.get("make", "Marque"), lang.get("model", "Modèle"), lang.get("year", "Année"), lang.get("revision_date_short", "Révision"), lang.get("control_date_short", "Contrôle")],
+        ([_text(v) for v in vehicle[1:]] for vehicle in queries.iter_rows(db_file, "vehicles", report_filter)),
+        lang.get("report_no_vehicles", "Aucun véhicule enregistré."), (3, 2, 2, 1, 2, 2), styles, width, counter)
+
+    yield from _section(
+        lang.get("report_drivers", "Conducteurs"),
+        [lang.get("name", "Nom"), lang.get("surname", "Prénom"), lang.get("license_number", "Numéro de permis"), lang.get("expiry_date_short", "Expiration")],
+        ([_text(d) for d in driver[1:]] for driver in queries.iter_rows(db_file, "drivers", report_filter)),
+        lang.get("report_no_drivers", "Aucun conducteur enregistré."), (1, 1, 1, 1), styles, width, counter)
+
+    # Immatriculation et nom du conducteur viennent de la jointure : aucune
+    # requête par ligne
+    yield from _section(
+        lang.get("report_expenses", "Dépenses"),
+        [lang.get("vehicle", "Véhicule"), lang.get("date", "Date"), lang.get("type", "Type"), lang.get("amount", "Montant"), lang.get("description", "Description")],
+        ([expense[1] or unknown, expense[2], expense[3], f"{expense[4]:.2f}", _text(expense[5])]
+         for expense in queries.iter_rows(db_file, "expenses", report_filter)),
+        lang.get("report_no_expenses", "Aucune dépense enregistrée."), (2, 2, 2, 1.5, 4), styles, width, counter)
+
+    yield from _section(
+        lang.get("report_missions", "Missions"),
+        [lang.get("driver", "Conducteur"), lang.get("start_date_short", "Début"), lang.get("end_date_short", "Fin"), lang.get("destination", "Destination"), lang.get("duration_short", "Durée"), lang.get("meals_short", "Repas"), lang.get("nights_short", "Nuits"), lang.get("weekends_short", "WE")],
+        ([mission[1] or unknown, mission[2], mission[3], mission[4]] + [_text(v) for v in mission[5:9]]
+         for mission in queries.iter_rows(db_file, "missions", report_filter)),
+        lang.get("report_no_missions", "Aucune mission enregistrée."), (3, 2, 2, 3, 1, 1, 1, 1), styles, width, counter)
+
+    yield from _section(
+        lang.get("report_assignments", "Affectations"),
+        [lang.get("vehicle", "Véhicule"), lang.get("driver", "Conducteur"), lang.get("assignment_date_short", "Date")],
+        ([assignment[1], f"{assignment[2]} {assignment[3]}", assignment[4]]
+         for assignment in queries.iter_rows(db_file, "assignments", report_filter)),
+        lang.get("report_no_assignments", "Aucune affectation enregistrée."), (1, 1, 1), styles, width, counter)
+
+def export_to_pdf(filepath, db_file, lang, for_print=False, report_filter=None, progress=None):
+    """Génère le rapport PDF en lisant la base au fil de la mise en page.
+
+    report_filter (queries.ReportFilter) restreint le rapport à une période,
+    des véhicules, des conducteurs ou des types de dépenses ;
+    progress(lignes_mises_en_page, total) est appelé régulièrement.
+    """
     doc = SimpleDocTemplate(filepath, pagesize=letter)
     styles = getSampleStyleSheet()
-    story = []
-
-    title = Paragraph(lang.get("report_title", "Rapport de Gestion de Flotte"), styles['h1'])
-    story.append(title)
-    story.append(Spacer(1, 12))
-
-    # --- Vehicles ---
-    story.append(Paragraph(lang.get("report_vehicles", "Véhicules"), styles['h2']))
-    if vehicles:
-        data = [[lang.get("registration", "Immatriculation"), lang.get("make", "Marque"), lang.get("model", "Modèle"), lang.get("year", "Année"), lang.get("revision_date_short", "Révision"), lang.get("control_date_short", "Contrôle")]]
-        for vehicle in vehicles:
-            data.append([str(v) for v in vehicle[1:]])
-        table = Table(data)
-        table.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                   ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                   ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                   ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                   ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                                   ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                                   ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        story.append(table)
-    else:
-        story.append(Paragraph(lang.get("report_no_vehicles", "Aucun véhicule enregistré."), styles['normal']))
-    story.append(Spacer(1, 12))
-
-    # --- Drivers ---
-    story.append(Paragraph(lang.get("report_drivers", "Conducteurs"), styles['h2']))
-    if drivers:
-        data = [[lang.get("name", "Nom"), lang.get("surname", "Prénom"), lang.get("license_number", "Numéro de permis"), lang.get("expiry_date_short", "Expiration")]]
-        for driver in drivers:
-            data.append([str(d) for d in driver[1:]])
-        table = Table(data)
-        table.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                   ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                   ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                   ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                   ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                                   ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                                   ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        story.append(table)
-    else:
-        story.append(Paragraph(lang.get("report_no_drivers", "Aucun conducteur enregistré."), styles['normal']))
-    story.append(Spacer(1, 12))
-
-    # --- Expenses ---
-    story.append(Paragraph(lang.get("report_expenses", "Dépenses"), styles['h2']))
-    if expenses:
-        data = [[lang.get("vehicle", "Véhicule"), lang.get("date", "Date"), lang.get("type", "Type"), lang.get("amount", "Montant"), lang.get("description", "Description")]]
-        for expense in expenses:
-            vehicle = database.get_vehicle(None, expense[1]) # Need a connection if not in the same scope
-            vehicle_reg = vehicle[1] if vehicle else lang.get("unknown", "Inconnu")
-            data.append([vehicle_reg, expense[2], expense[3], f"{expense[4]:.2f}", expense[5]])
-        table = Table(data)
-        table.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                   ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                   ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                   ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                   ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                                   ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                                   ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        story.append(table)
-    else:
-        story.append(Paragraph(lang.get("report_no_expenses", "Aucune dépense enregistrée."), styles['normal']))
-    story.append(Spacer(1, 12))
-
-    # --- Missions ---
-    story.append(Paragraph(lang.get("report_missions", "Missions"), styles['h2']))
-    if missions:
-        data = [[lang.get("driver", "Conducteur"), lang.get("start_date_short", "Début"), lang.get("end_date_short", "Fin"), lang.get("destination", "Destination"), lang.get("duration_short", "Durée"), lang.get("meals_short", "Repas"), lang.get("nights_short", "Nuits"), lang.get("weekends_short", "WE")]]
-        for mission in missions:
-            driver = database.get_driver(None, mission[1]) # Need a connection if not in the same scope
-            driver_name = f"{driver[1]} {driver[2]}" if driver else lang.get("unknown", "Inconnu")
-            data.append([driver_name, mission[2], mission[3], mission[4], str(mission[5]), str(mission[6]), str(mission[7]), str(mission[8])])
-        table = Table(data)
-        table.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                   ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                   ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                   ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                   ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                                   ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                                   ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        story.append(table)
-    else:
-        story.append(Paragraph(lang.get("report_no_missions", "Aucune mission enregistrée."), styles['normal']))
-    story.append(Spacer(1, 12))
-
-    # --- Assignments ---
-    story.append(Paragraph(lang.get("report_assignments", "Affectations"), styles['h2']))
-    if assignments:
-        data = [[lang.get("vehicle", "Véhicule"), lang.get("driver", "Conducteur"), lang.get("assignment_date_short", "Date")]]
-        for assignment in assignments:
-            data.append([assignment[1], f"{assignment[2]} {assignment[3]}", assignment[4]])
-        table = Table(data)
-        table.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                   ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                   ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                   ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                   ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                                   ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                                   ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-        story.append(table)
-    else:
-        story.append(Paragraph(lang.get("report_no_assignments", "Aucune affectation enregistrée."), styles['normal']))
-    story.append(Spacer(1, 12))
-
-    doc.build(story)
\ No newline at end of file
+    counter = queries.ProgressCounter(db_file, report_filter, progress)
+    doc.build(StreamingStory(_report(db_file, lang, styles, doc.width, report_filter or queries.ReportFilter(), counter)))
+    counter.finish()
@@ -0,0 +1,159 @@
+from collections import namedtuple
+from database.connection import get_connection
+
+# Filtres d'un rapport. Dates au format AAAA-MM-JJ, bornes incluses ;
+# None (ou un ensemble vide) ne filtre pas.
+#  - vehicle_ids : véhicules, leurs dépenses et leurs affectations
+#  - driver_ids : conducteurs, leurs missions et leurs affectations
+#  - expense_types : types de dépenses
+#  - start_date / end_date : dépenses et affectations datées dans la période,
+#    missions qui la chevauchent
+ReportFilter = namedtuple("ReportFilter", "start_date end_date vehicle_ids driver_ids expense_types",
+                          defaults=(None, None, None, None, None))
+
+# Taille des lots lus par iter_rows
+STREAM_BATCH_SIZE = 500
+
+# Ordre des sections dans les rapports
+SECTIONS = ("vehicles", "drivers", "expenses", "missions", "assignments")
+
+# Requêtes des sections : (colonnes, FROM, ORDER BY). Mêmes colonnes que
+# les list_* de db_utils (l'immatriculation ou "Nom Prénom" remplace la clé
+# étrangère) ; chaque ORDER BY suit un index utilisable par les filtres.
+_QUERIES = {
+    "vehicles": ("v.id, v.registration, v.make, v.model, v.year, v.revision_date, v.control_date",
+                 "vehicles v",
+                 "v.id"),
+    "drivers": ("d.id, d.name, d.surname, d.license_number, d.expiry_date",
+                "drivers d",
+                "d.id"),
+    "expenses": ("e.id, v.registration, e.date, e.type, e.amount, e.description, e.mileage, e.liters",
+                 "expenses e LEFT JOIN vehicles v ON e.vehicle_id = v.id",
+                 "e.date, e.id"),
+    "missions": ("m.id, d.name || ' ' || d.surname, m.start_date, m.end_date, m.destination,"
+                 " m.duration, m.meals, m.nights, m.weekends",
+                 "missions m LEFT JOIN drivers d ON m.driver_id = d.id",
+                 "m.start_date, m.id"),
+    "assignments": ("va.id, v.registration, d.name, d.surname, va.assignment_date",
+                    "vehicle_assignments va JOIN vehicles v ON va.vehicle_id = v.id"
+                    " JOIN drivers d ON va.driver_id = d.id",
+                    "va.assignment_date, va.id"),
+}
+
+def _in(column, values, clauses, params):
+    if values:
+        values = sorted(set(values))
+        clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+def _where(section, report_filter):
+    # Conditions paramétrées de la section : (clause WHERE, paramètres)
+    if section not in _QUERIES:
+        raise ValueError(f"Section de rapport inconnue : {section}")
+    clauses = []
+    params = []
+    start, end = report_filter.start_date, report_filter.end_date
+    if section == "vehicles":
+        _in("v.id", report_filter.vehicle_ids, clauses, params)
+    elif section == "drivers":
+        _in("d.id", report_filter.driver_ids, clauses, params)
+    elif section == "expenses":
+        # idx_expenses_date, idx_expenses_vehicle_date ou idx_expenses_type_date
+        if start:
+            clauses.append("e.date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("e.date <= ?")
+            params.append(end)
+        _in("e.vehicle_id", report_filter.vehicle_ids, clauses, params)
+        _in("e.type", report_filter.expense_types, clauses, params)
+    elif section == "missions":
+        # Chevauchement de la période : idx_missions_end_date ou
+        # idx_missions_driver_start
+        if start:
+            clauses.append("m.end_date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("m.start_date <= ?")
+            params.append(end)
+        _in("m.driver_id", report_filter.driver_ids, clauses, params)
+    elif section == "assignments":
+        if start:
+            clauses.append("va.assignment_date >= ?")
+            params.append(start)
+        if end:
+            clauses.append("va.assignment_date <= ?")
+            params.append(end)
+        _in("va.vehicle_id", report_filter.vehicle_ids, clauses, params)
+        _in("va.driver_id", report_filter.driver_ids, clauses, params)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+def section_query(section, report_filter=None):
+    """Requête paramétrée (sql, paramètres) des lignes d'une section du rapport."""
+    where, params = _where(section, report_filter or ReportFilter())
+    columns, tables, order_by = _QUERIES[section]
+    return f"SELECT {columns} FROM {tables}{where} ORDER BY {order_by}", params
+
+def iter_rows(db_file, section, report_filter=None):
+    # Générateur lisant le curseur par lots : la mémoire utilisée ne dépend
+    # pas du nombre de lignes. Le curseur reste ouvert jusqu'à épuisement.
+    cursor = get_connection(db_file).cursor()
+    cursor.execute(*section_query(section, report_filter))
+    while True:
+        rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+def count_rows(db_file, section, report_filter=None):
+    where, params = _where(section, report_filter or ReportFilter())
+    tables = _QUERIES[section][1]
+    cursor = get_connection(db_file).cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {tables}{where}", params)
+    return cursor.fetchone()[0]
+
+def tables(db_file, lang, report_filter=None):
+    """Sections du rapport sous forme de tableaux (exports Excel et CSV).
+
+    Génère (titre, en-têtes, lignes) dans l'ordre de SECTIONS ; les lignes
+    sont lues en flux par iter_rows.
+    """
+    unknown = lang.get("unknown", "Inconnu")
+    yield (lang.get("vehicles_title", "Véhicules"),
+           ['ID', lang.get("registration", "Immatriculation"), lang.get("make", "Marque"), lang.get("model", "Modèle"), lang.get("year", "Année"), lang.get("revision_date_short", "Révision"), lang.get("control_date_short", "Contrôle")],
+           iter_rows(db_file, "vehicles", report_filter))
+    yield (lang.get("drivers_title", "Conducteurs"),
+           ['ID', lang.get("name", "Nom"), lang.get("surname", "Prénom"), lang.get("license_number", "Numéro de permis"), lang.get("expiry_date_short", "Expiration")],
+           iter_rows(db_file, "drivers", report_filter))
+    # L'immatriculation et "Nom Prénom" viennent des jointures
+    yield (lang.get("expenses_title", "Dépenses"),
+           ['ID', lang.get("vehicle", "Véhicule"), lang.get("date", "Date"), lang.get("type", "Type"), lang.get("amount", "Montant"), lang.get("description", "Description"), lang.get("mileage", "Kilométrage"), lang.get("liters", "Litres")],
+           ((exp[0], exp[1] if exp[1] is not None else unknown) + tuple(exp[2:8])
+            for exp in iter_rows(db_file, "expenses", report_filter)))
+    yield (lang.get("missions_title", "Missions"),
+           ['ID', lang.get("driver", "Conducteur"), lang.get("start_date_short", "Début"), lang.get("end_date_short", "Fin"), lang.get("destination", "Destination"), lang.get("duration_short", "Durée"), lang.get("meals_short", "Repas"), lang.get("nights_short", "Nuits"), lang.get("weekends_short", "WE")],
+           ((mis[0], mis[1] if mis[1] is not None else unknown) + tuple(mis[2:9])
+            for mis in iter_rows(db_file, "missions", report_filter)))
+    yield (lang.get("assignments_title", "Affectations"),
+           ['ID', lang.get("registration", "Immatriculation"), lang.get("name", "Nom"), lang.get("surname", "Prénom"), lang.get("assignment_date_short", "Date d'affectation")],
+           iter_rows(db_file, "assignments", report_filter))
+
+class ProgressCounter:
+    """Progression d'un exporteur : step() à chaque ligne écrite,
+    callback(lignes, total) toutes les STREAM_BATCH_SIZE lignes et à finish().
+    """
+    def __init__(self, db_file, report_filter, callback):
+        self.done = 0
+        self.callback = callback
+        # Pas de comptage si personne ne suit la progression
+        self.total = sum(count_rows(db_file, section, report_filter) for section in SECTIONS) if callback else 0
+
+    def step(self):
+        self.done += 1
+        if self.callback and self.done % STREAM_BATCH_SIZE == 0:
+            # Les lignes ajoutées pendant l'export peuvent dépasser le comptage initial
+            self.callback(self.done, max(self.total, self.done))
+
+    def finish(self):
+        if self.callback:
+            self.callback(self.done, max(self.total, self.done))
@@ -2,25 +2,50 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import db_utils as root_database
 from datetime import datetime
+from ui.task_runner import TaskRunner
+from ui.paged_treeview import PagedTreeview
 
 class AssignmentWindow(tk.Toplevel):
-    def __init__(self, parent, db_file, lang, reload_callback):
+    def __init__(self, parent, db_file, lang):
         tk.Toplevel.__init__(self, parent)
         self.title(lang.get("assignments_title", "Gestion des Affectations"))
         self.geometry("700x400")
         self.db_file = db_file
         self.lang = lang
-        self.reload_callback = reload_callback
+        self.tasks = TaskRunner(self)
 
-        self.vehicles = root_database.list_vehicles(self.db_file)
-        self.vehicle_dict = {v[1]: v[0] for v in self.vehicles} # Registration : ID
-
-        self.drivers = root_database.list_drivers(self.db_file)
-        self.driver_dict = {f"{d[1]} {d[2]}": d[0] for d in self.drivers} # Name Surname : ID
+        self.vehicles = []
+        self.vehicle_dict = {}
+        self.drivers = []
+        self.driver_dict = {}
 
         self.create_widgets()
+        self.load_vehicles()
+        self.load_drivers()
         self.populate_treeview()
 
+    # Les listes des menus déroulants sont lues dans un thread de travail ; elles
+    # restent vides le temps du chargement
+    def load_vehicles(self):
+        self.tasks.submit(root_database.list_vehicles, self.db_file, key="vehicles",
+                          on_success=self.set_vehicles,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e)))
+
+    def set_vehicles(self, vehicles):
+        self.vehicles = vehicles
+        self.vehicle_dict = {v[1]: v[0] for v in vehicles} # Registration : ID
+        self.vehicle_combo.config(values=list(self.vehicle_dict.keys()))
+
+    def load_drivers(self):
+        self.tasks.submit(root_database.list_drivers, self.db_file, key="drivers",
+                          on_success=self.set_drivers,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e)))
+
+    def set_drivers(self, drivers):
+        self.drivers = drivers
+        self.driver_dict = {f"{d[1]} {d[2]}": d[0] for d in drivers} # Name Surname : ID
+        self.driver_combo.config(values=list(self.driver_dict.keys()))
+
     def create_widgets(self):
         # --- Form Frame ---
         form_frame = ttk.LabelFrame(self, text=self.lang.get("assignment_details", "Détails de l'Affectation"), padding=10)
@@ -49,7 +74,8 @@ class AssignmentWindow(tk.Toplevel):
         tree_frame = ttk.Frame(self, padding=10)
         tree_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.tree = ttk.Treeview(tree_frame, columns=("id", "vehicle_reg", "driver_name", "assignment_date"), show="headings")
+        self.list_view = PagedTreeview(tree_frame, ("id", "vehicle_reg", "driver_name", "assignment_date"), self.tasks, format_row=self.format_row)
+        self.tree = self.list_view.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("vehicle_reg", text=self.lang.get("vehicle", "Véhicule"))
         self.tree.heading("driver_name", text=self.lang.get("driver", "Conducteur"))
@@ -57,30 +83,25 @@ class AssignmentWindow(tk.Toplevel):
 
         for col in ["id", "vehicle_reg", "driver_name", "assignment_date"]:
             self.tree.column(col, width=150, anchor="center")
-            self.tree.heading(col, command=lambda c=col: self.sort_treeview(c, False))
+            self.tree.heading(col, command=lambda c=col: self.list_view.sort_by(c))
 
         self.tree.bind('<<TreeviewSelect>>', self.populate_form)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.list_view.grid(row=0, column=0, sticky="nsew")
 
         self.columnconfigure(1, weight=1)
         self.rowconfigure(0, weight=1)
 
     def populate_treeview(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        assignments = database.list_assignments(self.db_file)
-        for assignment in assignments:
-            self.tree.insert("", tk.END, values=assignment)
+        self.list_view.reload(lambda limit, offset, order_by, descending: root_database.list_assignments(self.db_file, limit, offset, order_by, descending))
+
+    def format_row(self, assignment):
+        # (id, immatriculation, nom, prénom, date) -> colonnes du Treeview
+        return (assignment[0], assignment[1], f"{assignment[2]} {assignment[3]}", assignment[4])
 
     def populate_form(self, event):
         selected_item = self.tree.selection()
         if selected_item:
-            assignment_id, vehicle_reg, driver_name_parts, assignment_date = self.tree.item(selected_item[0], 'values')
-            driver_name = f"{driver_name_parts[0]} {driver_name_parts[1]}"
+            assignment_id, vehicle_reg, driver_name, assignment_date = self.tree.item(selected_item[0], 'values')
             self.vehicle_combo.set(vehicle_reg)
             self.driver_combo.set(driver_name)
             self.date_entry.delete(0, tk.END)
@@ -113,7 +134,6 @@ class AssignmentWindow(tk.Toplevel):
         try:
             root_database.assign_vehicle_to_driver(self.db_file, vehicle_id, driver_id, assignment_date)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("assignment_added", "Véhicule affecté au conducteur avec succès."))
         except ValueError as e:
@@ -130,7 +150,6 @@ class AssignmentWindow(tk.Toplevel):
             try:
                 root_database.delete_assignment(self.db_file, self.selected_id)
                 self.populate_treeview()
-                self.reload_callback()
                 self.clear_form()
                 messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("assignment_deleted", "Affectation supprimée avec succès."))
                 self.delete_button.config(state=tk.DISABLED)
@@ -151,10 +170,3 @@ class AssignmentWindow(tk.Toplevel):
             return True
         except ValueError:
             return False
-
-    def sort_treeview(self, col, reverse):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
\ No newline at end of file
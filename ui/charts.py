@@ -0,0 +1,58 @@
+from tkinter import ttk
+
+class PieChart(ttk.Frame):
+    """Camembert matplotlib persistant, à partir de [(libellé, valeur)].
+
+    Une seule figure et un seul canevas : show_data() ne redessine que si
+    les données ou le titre ont changé depuis le dernier appel. matplotlib
+    n'est importé qu'au premier graphique non vide.
+    """
+    def __init__(self, parent, empty_text=""):
+        ttk.Frame.__init__(self, parent)
+        self.figure = None
+        self.canvas = None
+        self.ax = None
+        self._last_key = None
+        self.empty_label = ttk.Label(self, text=empty_text)
+
+    def _create_canvas(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        # Figure plutôt que pyplot : pas d'état global à fermer après chaque tracé
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+
+    @staticmethod
+    def cache_key(data):
+        # Arrondi au centime : un écart de virgule flottante ne redessine pas
+        return tuple((label, round(value or 0.0, 2)) for label, value in data)
+
+    def show_data(self, data, title="", empty_text=None):
+        if empty_text is not None:
+            self.empty_label.config(text=empty_text)
+        key = (self.cache_key(data), title)
+        if key == self._last_key:
+            return
+        self._last_key = key
+
+        if not data:
+            if self.canvas is not None:
+                self.canvas.get_tk_widget().pack_forget()
+            self.empty_label.pack(padx=10, pady=10)
+            return
+
+        if self.canvas is None:
+            self._create_canvas()
+        self.empty_label.pack_forget()
+        self.ax.clear()
+        self.draw(self.ax, data)
+        self.ax.set_title(title)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.canvas.draw_idle()
+
+    def draw(self, ax, data):
+        labels = [item[0] for item in data]
+        sizes = [item[1] for item in data]
+        ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
+        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
@@ -5,16 +5,20 @@ from utils.validation_utils import validate_date
 from datetime import datetime
 from utils.excel_utils import import_xls_file, export_xls_file
 from utils.print_utils import PrintPreviewDialog
+from ui.import_progress import ImportProgressDialog
+import importing.pipeline as import_pipeline
+from ui.task_runner import TaskRunner
+from ui.paged_treeview import PagedTreeview
 import tkinter.filedialog as filedialog
 
 class DriversWindow(tk.Toplevel):
-    def __init__(self, parent, db_file, lang, reload_callback):
+    def __init__(self, parent, db_file, lang):
         tk.Toplevel.__init__(self, parent)
         self.title(lang.get("drivers_title", "Gestion des Conducteurs"))
         self.geometry("800x400")
         self.db_file = db_file
         self.lang = lang
-        self.reload_callback = reload_callback
+        self.tasks = TaskRunner(self)
 
         self.create_widgets()
         self.populate_treeview()
@@ -85,7 +89,8 @@ class DriversWindow(tk.Toplevel):
         tree_frame = ttk.Frame(self, padding=10)
         tree_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.tree = ttk.Treeview(tree_frame, columns=("id", "name", "surname", "license_number", "expiry_date"), show="headings")
+        self.list_view = PagedTreeview(tree_frame, ("id", "name", "surname", "license_number", "expiry_date"), self.tasks)
+        self.tree = self.list_view.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("name", text=self.lang.get("name", "Nom"))
         self.tree.heading("surname", text=self.lang.get("surname", "Prénom"))
@@ -94,14 +99,10 @@ class DriversWindow(tk.Toplevel):
 
         for col in ["id", "name", "surname", "license_number", "expiry_date"]:
             self.tree.column(col, width=150, anchor="center")
-            self.tree.heading(col, command=lambda c=col: self.sort_treeview(c, False))
+            self.tree.heading(col, command=lambda c=col: self.list_view.sort_by(c))
 
         self.tree.bind('<<TreeviewSelect>>', self.populate_form)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.list_view.grid(row=0, column=0, sticky="nsew")
 
         search_frame = ttk.LabelFrame(self, text=self.lang.get("search", "Rechercher"), padding=5)
         search_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
@@ -113,42 +114,38 @@ class DriversWindow(tk.Toplevel):
         self.rowconfigure(0, weight=1)
 
     def populate_treeview(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        drivers = root_database.list_drivers(self.db_file)
-        for driver in drivers:
-            self.tree.insert("", tk.END, values=driver)
+        self.list_view.reload(lambda limit, offset, order_by, descending: root_database.list_drivers(self.db_file, limit, offset, order_by, descending))
 
     def import_drivers(self):
         workbook, error = import_xls_file()
         if error:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), error)
             return
-        try:
-            sheet = workbook.sheet_by_index(0)
-            for row_idx in range(1, sheet.nrows):
-                row = sheet.row_values(row_idx)
-                # Assuming columns: first_name, last_name, license_number, phone, email
-                first_name = row[0]
-                last_name = row[1]
-                license_number = row[2]
-                phone = row[3]
-                email = row[4]
-                root_database.add_driver(self.db_file, first_name, last_name, license_number, phone, email)
-            self.populate_treeview()
-            self.reload_callback()
-            messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("import_success", "Importation réussie."))
-        except Exception as e:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_import_failed", "Échec de l'importation: ") + str(e))
+        dialog = ImportProgressDialog(self, self.lang)
+        self.tasks.submit(import_pipeline.import_drivers, self.db_file, workbook,
+                          progress=self.tasks.progress_callback(dialog.update_progress),
+                          on_success=lambda report: self.on_import_done(dialog, report),
+                          on_error=lambda error: self.on_import_failed(dialog, error))
+
+    def on_import_done(self, dialog, report):
+        self.populate_treeview()
+        dialog.show_report(report)
+
+    def on_import_failed(self, dialog, error):
+        dialog.destroy()
+        messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_import_failed", "Échec de l'importation: ") + str(error))
 
+    # Le Treeview ne contient que les pages déjà chargées : l'export et
+    # l'impression relisent la liste complète depuis la base.
     def export_drivers(self):
+        self.tasks.submit(root_database.list_drivers, self.db_file,
+                          on_success=self.write_drivers_export,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_failed", "Échec de l'exportation: ") + str(e)))
+
+    def write_drivers_export(self, drivers):
         try:
-            data = []
-            headers = ["ID", "Prénom", "Nom", "Numéro de permis", "Téléphone", "Email"]
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                data.append(values)
-            error = export_xls_file(data, headers)
+            headers = ["ID", "Prénom", "Nom", "Numéro de permis", "Date d'expiration"]
+            error = export_xls_file(list(drivers), headers)
             if error:
                 messagebox.showerror(self.lang.get("error_title", "Erreur"), error)
             else:
@@ -157,13 +154,14 @@ class DriversWindow(tk.Toplevel):
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_failed", "Échec de l'exportation: ") + str(e))
 
     def print_drivers(self):
+        self.tasks.submit(root_database.list_drivers, self.db_file,
+                          on_success=self.show_drivers_preview,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_print_failed", "Échec de l'impression: ") + str(e)))
+
+    def show_drivers_preview(self, drivers):
         try:
-            data = []
-            headers = ["ID", "Prénom", "Nom", "Numéro de permis", "Téléphone", "Email"]
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                data.append(values)
-            preview = PrintPreviewDialog(self, data, headers, title=self.lang.get("print_preview_title", "Aperçu avant impression"))
+            headers = ["ID", "Prénom", "Nom", "Numéro de permis", "Date d'expiration"]
+            preview = PrintPreviewDialog(self, list(drivers), headers, title=self.lang.get("print_preview_title", "Aperçu avant impression"))
             preview.grab_set()
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_print_failed", "Échec de l'impression: ") + str(e))
@@ -205,7 +203,6 @@ class DriversWindow(tk.Toplevel):
         try:
             root_database.add_driver(self.db_file, name, surname, license_number, expiry_date)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("driver_added", "Conducteur ajouté avec succès."))
         except ValueError as e:
@@ -234,7 +231,6 @@ class DriversWindow(tk.Toplevel):
         try:
             root_database.update_driver(self.db_file, self.selected_id, name, surname, license_number, expiry_date)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("driver_updated", "Conducteur mis à jour avec succès."))
             self.update_button.config(state=tk.DISABLED)
@@ -254,12 +250,13 @@ class DriversWindow(tk.Toplevel):
             try:
                 root_database.delete_driver(self.db_file, self.selected_id)
                 self.populate_treeview()
-                self.reload_callback()
                 self.clear_form()
                 messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("driver_deleted", "Conducteur supprimé avec succès."))
                 self.update_button.config(state=tk.DISABLED)
                 self.delete_button.config(state=tk.DISABLED)
                 self.selected_id = None
+            except ValueError as e:
+                messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
             except Exception as e:
                 messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -275,17 +272,6 @@ class DriversWindow(tk.Toplevel):
     def search_drivers(self):
         query = self.search_entry.get()
         if query:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            drivers = root_database.search_drivers(self.db_file, query)
-            for driver in drivers:
-                self.tree.insert("", tk.END, values=driver)
+            self.list_view.reload(lambda limit, offset, order_by, descending: root_database.search_drivers(self.db_file, query, limit, offset, order_by, descending))
         else:
             self.populate_treeview()
-
-    def sort_treeview(self, col, reverse):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
\ No newline at end of file
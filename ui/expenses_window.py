@@ -5,24 +5,41 @@ from utils.validation_utils import validate_date
 from datetime import datetime
 from utils.excel_utils import import_xls_file, export_xls_file
 from utils.print_utils import PrintPreviewDialog
+from ui.import_progress import ImportProgressDialog
+import importing.pipeline as import_pipeline
+from ui.task_runner import TaskRunner
+from ui.paged_treeview import PagedTreeview
 import tkinter.filedialog as filedialog
 
 class ExpensesWindow(tk.Toplevel):
-    def __init__(self, parent, db_file, lang, reload_callback):
+    def __init__(self, parent, db_file, lang):
         tk.Toplevel.__init__(self, parent)
         self.title(lang.get("expenses_title", "Gestion des Dépenses"))
         self.geometry("900x450")
         self.db_file = db_file
         self.lang = lang
-        self.reload_callback = reload_callback
+        self.tasks = TaskRunner(self)
 
-        self.vehicles = root_database.list_vehicles(self.db_file)
-        self.vehicle_dict = {f"{v[1]} ({v[2]})": v[0] for v in self.vehicles} # Registration (Model) : ID
+        self.vehicles = []
+        self.vehicle_dict = {}
 
         self.create_widgets()
+        self.load_vehicles()
         self.populate_treeview()
         self.create_import_export_print_buttons()
 
+    # La liste du menu déroulant est lue dans un thread de travail ; elle
+    # reste vide le temps du chargement
+    def load_vehicles(self):
+        self.tasks.submit(root_database.list_vehicles, self.db_file, key="vehicles",
+                          on_success=self.set_vehicles,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e)))
+
+    def set_vehicles(self, vehicles):
+        self.vehicles = vehicles
+        self.vehicle_dict = {f"{v[1]} ({v[2]})": v[0] for v in vehicles} # Registration (Model) : ID
+        self.vehicle_combo.config(values=list(self.vehicle_dict.keys()))
+
     def create_widgets(self):
         # --- Form Frame ---
         form_frame = ttk.LabelFrame(self, text=self.lang.get("expense_details", "Détails de la Dépense"), padding=10)
@@ -83,7 +100,8 @@ class ExpensesWindow(tk.Toplevel):
         tree_frame = ttk.Frame(self, padding=10)
         tree_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.tree = ttk.Treeview(tree_frame, columns=("id", "vehicle_reg", "date", "type", "amount", "description", "mileage", "liters"), show="headings")
+        self.list_view = PagedTreeview(tree_frame, ("id", "vehicle_reg", "date", "type", "amount", "description", "mileage", "liters"), self.tasks, format_row=self.format_row)
+        self.tree = self.list_view.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("vehicle_reg", text=self.lang.get("vehicle", "Véhicule"))
         self.tree.heading("date", text=self.lang.get("date", "Date"))
@@ -95,66 +113,57 @@ class ExpensesWindow(tk.Toplevel):
 
         for col in ["id", "vehicle_reg", "date", "type", "amount", "description", "mileage", "liters"]:
             self.tree.column(col, width=100, anchor="center")
-            self.tree.heading(col, command=lambda c=col: self.sort_treeview(c, False))
+            self.tree.heading(col, command=lambda c=col: self.list_view.sort_by(c))
 
         self.tree.bind('<<TreeviewSelect>>', self.populate_form)
-        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.list_view.grid(row=0, column=0, sticky="nsew")
 
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        search_frame = ttk.LabelFrame(self, text=self.lang.get("search", "Rechercher"), padding=5)
+        search_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.search_entry = ttk.Entry(search_frame)
+        self.search_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(search_frame, text=self.lang.get("button_search", "Rechercher"), command=self.search_expenses).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         self.columnconfigure(1, weight=1)
         self.rowconfigure(0, weight=1)
 
     def populate_treeview(self, vehicle_id=None):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        expenses = root_database.list_expenses(self.db_file, vehicle_id)
-        for expense in expenses:
-            vehicle = root_database.get_vehicle(self.db_file, expense[1])
-            vehicle_reg = vehicle[1] if vehicle else self.lang.get("unknown", "Inconnu")
-            self.tree.insert("", tk.END, values=(expense[0], vehicle_reg, expense[2], expense[3], expense[4], expense[5], expense[6], expense[7]))
+        self.list_view.reload(lambda limit, offset, order_by, descending: root_database.list_expenses_with_vehicle(self.db_file, vehicle_id, limit, offset, order_by, descending))
+
+    def format_row(self, expense):
+        vehicle_reg = expense[1] if expense[1] is not None else self.lang.get("unknown", "Inconnu")
+        return (expense[0], vehicle_reg) + tuple(expense[2:])
 
     def import_expenses(self):
         workbook, error = import_xls_file()
         if error:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), error)
             return
-        try:
-            sheet = workbook.sheet_by_index(0)
-            for row_idx in range(1, sheet.nrows):
-                row = sheet.row_values(row_idx)
-                # Assuming columns: vehicle_reg, date, type, amount, description, mileage, liters
-                vehicle_reg = row[0]
-                vehicle_id = None
-                for key, val in self.vehicle_dict.items():
-                    if vehicle_reg == key:
-                        vehicle_id = val
-                        break
-                if vehicle_id is None:
-                    continue  # skip unknown vehicle
-                date = row[1]
-                type = row[2]
-                amount = float(row[3]) if row[3] else 0.0
-                description = row[4]
-                mileage = int(row[5]) if row[5] else None
-                liters = float(row[6]) if row[6] else None
-                root_database.add_expense(self.db_file, vehicle_id, date, type, amount, description, mileage, liters)
-            self.populate_treeview()
-            self.reload_callback()
-            messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("import_success", "Importation réussie."))
-        except Exception as e:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_import_failed", "Échec de l'importation: ") + str(e))
+        dialog = ImportProgressDialog(self, self.lang)
+        self.tasks.submit(import_pipeline.import_expenses, self.db_file, workbook,
+                          progress=self.tasks.progress_callback(dialog.update_progress),
+                          on_success=lambda report: self.on_import_done(dialog, report),
+                          on_error=lambda error: self.on_import_failed(dialog, error))
 
+    def on_import_done(self, dialog, report):
+        self.populate_treeview()
+        dialog.show_report(report)
+
+    def on_import_failed(self, dialog, error):
+        dialog.destroy()
+        messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_import_failed", "Échec de l'importation: ") + str(error))
+
+    # Le Treeview ne contient que les pages déjà chargées : l'export et
+    # l'impression relisent la liste complète depuis la base.
     def export_expenses(self):
+        self.tasks.submit(root_database.list_expenses_with_vehicle, self.db_file,
+                          on_success=self.write_expenses_export,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_failed", "Échec de l'exportation: ") + str(e)))
+
+    def write_expenses_export(self, expenses):
         try:
-            data = []
             headers = ["ID", "Véhicule", "Date", "Type", "Montant", "Description", "Kilométrage", "Litres"]
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                data.append(values)
-            error = export_xls_file(data, headers)
+            error = export_xls_file([self.format_row(expense) for expense in expenses], headers)
             if error:
                 messagebox.showerror(self.lang.get("error_title", "Erreur"), error)
             else:
@@ -163,13 +172,14 @@ class ExpensesWindow(tk.Toplevel):
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_failed", "Échec de l'exportation: ") + str(e))
 
     def print_expenses(self):
+        self.tasks.submit(root_database.list_expenses_with_vehicle, self.db_file,
+                          on_success=self.show_expenses_preview,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_print_failed", "Échec de l'impression: ") + str(e)))
+
+    def show_expenses_preview(self, expenses):
         try:
-            data = []
             headers = ["ID", "Véhicule", "Date", "Type", "Montant", "Description", "Kilométrage", "Litres"]
-            for item in self.tree.get_children():
-                values = self.tree.item(item, "values")
-                data.append(values)
-            preview = PrintPreviewDialog(self, data, headers, title=self.lang.get("print_preview_title", "Aperçu avant impression"))
+            preview = PrintPreviewDialog(self, [self.format_row(expense) for expense in expenses], headers, title=self.lang.get("print_preview_title", "Aperçu avant impression"))
             preview.grab_set()
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_print_failed", "Échec de l'impression: ") + str(e))
@@ -228,14 +238,17 @@ class ExpensesWindow(tk.Toplevel):
             amount = float(amount_str) if amount_str else 0.0
             mileage = int(mileage_str) if mileage_str else None
             liters = float(liters_str) if liters_str else None
+        except ValueError:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Montant, kilométrage ou litres invalides."))
+            return
 
+        try:
             root_database.add_expense(self.db_file, vehicle_id, date, type, amount, description, mileage, liters)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("expense_added", "Dépense ajoutée avec succès."))
-        except ValueError:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Montant, kilométrage ou litres invalides."))
+        except ValueError as e:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -265,17 +278,20 @@ class ExpensesWindow(tk.Toplevel):
             amount = float(amount_str) if amount_str else 0.0
             mileage = int(mileage_str) if mileage_str else None
             liters = float(liters_str) if liters_str else None
+        except ValueError:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Montant, kilométrage ou litres invalides."))
+            return
 
+        try:
             root_database.update_expense(self.db_file, self.selected_id, vehicle_id, date, type, amount, description, mileage, liters)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("expense_updated", "Dépense mise à jour avec succès."))
             self.update_button.config(state=tk.DISABLED)
             self.delete_button.config(state=tk.DISABLED)
             self.selected_id = None
-        except ValueError:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Montant, kilométrage ou litres invalides."))
+        except ValueError as e:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -288,7 +304,6 @@ class ExpensesWindow(tk.Toplevel):
             try:
                 root_database.delete_expense(self.db_file, self.selected_id)
                 self.populate_treeview()
-                self.reload_callback()
                 self.clear_form()
                 messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("expense_deleted", "Dépense supprimée avec succès."))
                 self.update_button.config(state=tk.DISABLED)
@@ -309,15 +324,9 @@ class ExpensesWindow(tk.Toplevel):
         self.delete_button.config(state=tk.DISABLED)
         self.selected_id = None
 
-    def sort_treeview(self, col, reverse):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        try:
-            if col == "amount" or col == "mileage" or col == "liters":
-                data.sort(key=lambda item: float(item[0]) if item[0] else float('-inf'), reverse=reverse)
-            else:
-                data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        except ValueError:
-            data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
\ No newline at end of file
+    def search_expenses(self):
+        query = self.search_entry.get()
+        if query:
+            self.list_view.reload(lambda limit, offset, order_by, descending: root_database.search_expenses(self.db_file, query, None, limit, offset, order_by, descending))
+        else:
+            self.populate_treeview()
@@ -0,0 +1,37 @@
+import tkinter as tk
+from tkinter import ttk
+
+class ExportProgressDialog(tk.Toplevel):
+    def __init__(self, parent, lang, on_cancel=None):
+        tk.Toplevel.__init__(self, parent)
+        self.title(lang.get("export_progress_title", "Exportation en cours"))
+        self.geometry("400x130")
+        self.lang = lang
+        self.on_cancel = on_cancel
+        self.transient(parent)
+        # Fermer la fenêtre revient à annuler ; sans on_cancel, l'exportation
+        # se poursuit en arrière-plan et la fenêtre reste ouverte
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.create_widgets()
+
+    def create_widgets(self):
+        self.progress_label = ttk.Label(self, text=self.lang.get("export_progress_started", "Lecture de la base..."))
+        self.progress_label.pack(padx=10, pady=10, fill="x")
+        self.progress_bar = ttk.Progressbar(self, mode="determinate", maximum=1)
+        self.progress_bar.pack(padx=10, pady=5, fill="x")
+        if self.on_cancel is not None:
+            self.cancel_button = ttk.Button(self, text=self.lang.get("button_cancel", "Annuler"), command=self.cancel)
+            self.cancel_button.pack(pady=5)
+
+    def cancel(self):
+        if self.on_cancel is None:
+            return
+        # La fenêtre est fermée par l'appelant quand la tâche s'est arrêtée
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_label.config(text=self.lang.get("export_cancelling", "Annulation..."))
+        self.on_cancel()
+
+    def update_progress(self, processed, total):
+        self.progress_bar.config(maximum=max(total, 1), value=processed)
+        self.progress_label.config(text=f"{self.lang.get('export_progress_rows', 'Lignes exportées :')} {processed} / {total}")
+        self.update_idletasks()
@@ -0,0 +1,56 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+class ImportProgressDialog(tk.Toplevel):
+    def __init__(self, parent, lang):
+        tk.Toplevel.__init__(self, parent)
+        self.title(lang.get("import_progress_title", "Importation en cours"))
+        self.geometry("400x100")
+        self.lang = lang
+        self.transient(parent)
+        # Pas de fermeture pendant l'importation : elle se poursuit en arrière-plan
+        self.protocol("WM_DELETE_WINDOW", lambda: None)
+        self.create_widgets()
+
+    def create_widgets(self):
+        self.progress_label = ttk.Label(self, text=self.lang.get("import_progress_started", "Lecture du fichier..."))
+        self.progress_label.pack(padx=10, pady=10, fill="x")
+        self.progress_bar = ttk.Progressbar(self, mode="determinate", maximum=1)
+        self.progress_bar.pack(padx=10, pady=5, fill="x")
+
+    def update_progress(self, processed, total):
+        self.progress_bar.config(maximum=max(total, 1), value=processed)
+        self.progress_label.config(text=f"{self.lang.get('import_progress_rows', 'Lignes traitées :')} {processed} / {total}")
+        self.update_idletasks()
+
+    def show_report(self, report):
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        summary = f"{self.lang.get('import_rows_inserted', 'Lignes importées :')} {report.inserted}"
+        if not report.rejected:
+            self.destroy()
+            messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("import_success", "Importation réussie.") + "\n" + summary)
+            return
+
+        # Rapport des lignes refusées, consultable avant de corriger le fichier
+        self.title(self.lang.get("import_report_title", "Rapport d'importation"))
+        self.geometry("600x350")
+        self.progress_bar.pack_forget()
+        self.progress_label.config(text=f"{summary} - {self.lang.get('import_rows_rejected', 'Lignes refusées :')} {len(report.rejected)}")
+
+        tree_frame = ttk.Frame(self)
+        tree_frame.pack(padx=10, pady=5, fill="both", expand=True)
+        tree = ttk.Treeview(tree_frame, columns=("row", "reason"), show="headings")
+        tree.heading("row", text=self.lang.get("import_column_row", "Ligne"))
+        tree.heading("reason", text=self.lang.get("import_column_reason", "Motif"))
+        tree.column("row", width=80, anchor="center")
+        tree.column("reason", width=450)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar_y.set)
+        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        tree_frame.columnconfigure(0, weight=1)
+        tree_frame.rowconfigure(0, weight=1)
+        for row_number, reason in report.rejected:
+            tree.insert("", tk.END, values=(row_number, reason))
+
+        ttk.Button(self, text=self.lang.get("button_close", "Fermer"), command=self.destroy).pack(pady=5)
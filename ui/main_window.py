@@ -1,22 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import db_utils as root_database
-from ui.vehicles_window import VehiclesWindow
-from ui.drivers_window import DriversWindow
-from ui.expenses_window import ExpensesWindow
-from ui.missions_window import MissionsWindow
-from ui.assignment_window import AssignmentWindow
-from ui.about_window import AboutWindow
-from reporting.pdf_exporter import export_to_pdf
-from reporting.excel_exporter import export_to_excel
-from utils.date_utils import calculate_weekends
-import pandas as pd
+from ui.task_runner import TaskRunner
+from ui.charts import PieChart
+from database import alerts, events
 import os
+import queue
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Fréquence de relève des modifications publiées par db_utils
+CHANGES_POLL_INTERVAL_MS = 200
+# Nombre d'affectations affichées dans l'onglet "Affectations Récentes"
+RECENT_ASSIGNMENTS_LIMIT = 5
+
 class MainWindow(ttk.Frame):
     def __init__(self, parent, db_file, lang, switch_language_callback):
         ttk.Frame.__init__(self, parent, padding=10)
@@ -31,6 +29,19 @@ class MainWindow(ttk.Frame):
         self.missions_window = None
         self.assignment_window = None
         self.about_window = None
+        self.export_job = None
+        self.tasks = TaskRunner(self)
+        # section -> (lecture dans un thread de travail, affichage dans le thread Tk)
+        self.sections = {
+            "alerts": (self.fetch_alerts, self.show_alerts),
+            "overview": (root_database.get_dashboard_snapshot, self.show_overview),
+            "assignments": (self.fetch_recent_assignments, self.show_recent_assignments),
+            "expenses": (root_database.get_expenses_by_type, self.plot_expenses_pie_chart),
+        }
+        self.pending_changes = queue.Queue()
+        events.subscribe(self.pending_changes.put)
+        self._changes_poll_id = self.after(CHANGES_POLL_INTERVAL_MS, self.process_changes)
+        self.bind("<Destroy>", self._on_destroy, add="+")
 
         self.grid(column=0, row=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         parent.columnconfigure(0, weight=1)
@@ -38,7 +49,6 @@ class MainWindow(ttk.Frame):
 
         self.create_widgets()
         self.update_language(self.lang)
-        self.load_dashboard_data()
 
     def update_language(self, lang):
         self.lang = lang
@@ -71,7 +81,8 @@ class MainWindow(ttk.Frame):
         self.tv_assignments.heading("driver", text=self.lang.get("assignments_column_driver", "Conducteur"))
         self.tv_assignments.heading("date", text=self.lang.get("assignments_column_date", "Date d'affectation"))
 
-        self.load_dashboard_data() # Reload data with new language
+        # Après le premier affichage : la fenêtre apparaît sans attendre les données
+        self.after_idle(self.load_dashboard_data) # Reload data with new language
 
     def create_widgets(self):
         self.lbl_dashboard = ttk.Label(self, font=("Arial", 16))
@@ -87,6 +98,7 @@ class MainWindow(ttk.Frame):
         self.tv_alerts.column("type", width=200)
         self.tv_alerts.column("item", width=200)
         self.tv_alerts.column("date", width=150)
+        self.tv_alerts.tag_configure(alerts.SEVERITY_CRITICAL, foreground="red")
         self.tv_alerts.grid(row=0, column=0, sticky="nsew")
         scrollbar_alerts_y = ttk.Scrollbar(self.tab_alerts, orient="vertical", command=self.tv_alerts.yview)
         self.tv_alerts.configure(yscrollcommand=scrollbar_alerts_y.set)
@@ -128,9 +140,11 @@ class MainWindow(ttk.Frame):
 
         # --- Expenses Breakdown Tab ---
         self.tab_expenses = ttk.Frame(self.nb_dashboard)
-        self.expenses_canvas = tk.Canvas(self.tab_expenses)
-        self.expenses_canvas.pack(fill="both", expand=True)
+        self.expenses_chart = PieChart(self.tab_expenses)
+        self.expenses_chart.pack(fill="both", expand=True)
         self.nb_dashboard.add(self.tab_expenses)
+        self.expenses_data = None
+        self.nb_dashboard.bind("<<NotebookTabChanged>>", self.on_dashboard_tab_changed)
 
         # --- Buttons ---
         button_frame = ttk.Frame(self)
@@ -171,150 +185,206 @@ class MainWindow(ttk.Frame):
         self.rowconfigure(1, weight=1)
 
     def load_dashboard_data(self):
-        # Load alerts
+        self.refresh_sections(self.sections)
+
+    def refresh_sections(self, sections):
+        # Une tâche par section ; la clé remplace un rafraîchissement encore en cours
+        for section in sections:
+            fetch, show = self.sections[section]
+            self.tasks.submit(fetch, self.db_file, on_success=show, key=section)
+
+    @staticmethod
+    def dashboard_sections(event):
+        """Sections du tableau de bord touchées par un ChangeEvent."""
+        if event.entity in ("vehicle", "driver"):
+            sections = {"alerts"}
+            if event.operation != events.UPDATE:
+                sections.add("overview")  # nombre de véhicules / conducteurs
+            if event.operation != events.INSERT:
+                sections.add("assignments")  # immatriculation / nom affichés
+            return sections
+        if event.entity == "expense":
+            return {"overview", "expenses"}
+        if event.entity == "assignment":
+            return {"assignments"}
+        return set()
+
+    def process_changes(self):
+        # Les modifications sont publiées depuis n'importe quel thread : elles
+        # sont relevées ici, dans le thread Tk, et regroupées par section.
+        sections = set()
+        while not self.pending_changes.empty():
+            sections |= self.dashboard_sections(self.pending_changes.get_nowait())
+        self.refresh_sections(sections)
+        self._changes_poll_id = self.after(CHANGES_POLL_INTERVAL_MS, self.process_changes)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            events.unsubscribe(self.pending_changes.put)
+            if self.export_job is not None:
+                self.export_job.cancel()
+            if self._changes_poll_id is not None:
+                self.after_cancel(self._changes_poll_id)
+                self._changes_poll_id = None
+
+    # Les fetch_* sont exécutées dans un thread de travail : aucun accès à Tk
+    @staticmethod
+    def fetch_alerts(db_file):
+        return alerts.collect_alerts(db_file)
+
+    @staticmethod
+    def fetch_recent_assignments(db_file):
+        return root_database.recent_assignments(db_file, RECENT_ASSIGNMENTS_LIMIT)
+
+    def show_alerts(self, alert_list):
         for item in self.tv_alerts.get_children():
             self.tv_alerts.delete(item)
-        vehicle_alerts = root_database.check_vehicle_alerts(self.db_file)
-        driver_alerts = root_database.check_driver_alerts(self.db_file)
-        for alert in vehicle_alerts:
-            self.tv_alerts.insert("", tk.END, values=(alert['type'], f"{self.lang.get('vehicle', 'Véhicule')} {alert['registration']}", alert['date']))
-        for alert in driver_alerts:
-            self.tv_alerts.insert("", tk.END, values=(alert['type'], f"{self.lang.get('driver', 'Conducteur')} {alert['name']}", alert['date']))
-
-        # Load overview data
-        vehicles = root_database.list_vehicles(self.db_file)
-        drivers = root_database.list_drivers(self.db_file)
-        total_expenses = root_database.get_total_expenses(self.db_file)
-        self.lbl_total_vehicles.config(text=len(vehicles))
-        self.lbl_total_drivers.config(text=len(drivers))
-        self.lbl_total_expenses_overview.config(text=f"{total_expenses:.2f}")
+        for alert in alert_list:
+            if alert.entity == "driver":
+                item = f"{self.lang.get('driver', 'Conducteur')} {alert.label}"
+            else:
+                item = f"{self.lang.get('vehicle', 'Véhicule')} {alert.label}"
+            self.tv_alerts.insert("", tk.END, values=(alert.type, item, alert.date), tags=(alert.severity,))
+
+    def show_overview(self, data):
+        self.lbl_total_vehicles.config(text=data["total_vehicles"])
+        self.lbl_total_drivers.config(text=data["total_drivers"])
+        self.lbl_total_expenses_overview.config(text=f"{data['total_expenses']:.2f}")
         self.lbl_total_vehicles_text.config(text=self.lang.get("overview_total_vehicles", "Total Véhicules:"))
         self.lbl_total_drivers_text.config(text=self.lang.get("overview_total_drivers", "Total Conducteurs:"))
         self.lbl_total_expenses_overview_text.config(text=self.lang.get("overview_total_expenses", "Dépenses Totales:"))
 
-        # Load recent assignments
+    def show_recent_assignments(self, assignments):
         for item in self.tv_assignments.get_children():
             self.tv_assignments.delete(item)
-        assignments = root_database.list_assignments(self.db_file)
-        assignments.sort(key=lambda x: datetime.strptime(x[4], '%Y-%m-%d'), reverse=True) # Sort by date
-        for assignment in assignments[:5]: # Display the 5 most recent
+        for assignment in assignments:
             self.tv_assignments.insert("", tk.END, values=(assignment[1], f"{assignment[2]} {assignment[3]}", assignment[4]))
 
-        # Load expenses breakdown
-        expenses_data = root_database.get_expenses_by_type(self.db_file)
-        self.plot_expenses_pie_chart(expenses_data)
-
     def plot_expenses_pie_chart(self, expenses_data):
-        import matplotlib.pyplot as plt
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        # matplotlib n'est chargé qu'à la première ouverture de l'onglet
+        self.expenses_data = expenses_data
+        if self.nb_dashboard.select() == str(self.tab_expenses):
+            self.draw_expenses_chart()
 
-        for widget in self.expenses_canvas.winfo_children():
-            widget.destroy()
-
-        if not expenses_data:
-            no_data_label = ttk.Label(self.expenses_canvas, text=self.lang.get("expenses_no_data", "Aucune dépense enregistrée."))
-            no_data_label.pack(padx=10, pady=10)
-            return
-
-        labels = [item[0] for item in expenses_data]
-        sizes = [item[1] for item in expenses_data]
-        if not sizes:
-            no_data_label = ttk.Label(self.expenses_canvas, text=self.lang.get("expenses_no_data", "Aucune dépense enregistrée."))
-            no_data_label.pack(padx=10, pady=10)
-            return
+    def on_dashboard_tab_changed(self, event):
+        if self.expenses_data is not None and self.nb_dashboard.select() == str(self.tab_expenses):
+            self.draw_expenses_chart()
 
-        fig, ax = plt.subplots()
-        ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-        ax.set_title(self.lang.get("expenses_breakdown", "Répartition des Dépenses"))
-
-        canvas = FigureCanvasTkAgg(fig, master=self.expenses_canvas)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(fill="both", expand=True)
-        canvas.draw()
-        plt.close(fig) # Close the matplotlib figure to prevent memory issues
+    def draw_expenses_chart(self):
+        # Ne redessine que si la répartition (ou la langue) a changé
+        self.expenses_chart.show_data(self.expenses_data,
+                                      title=self.lang.get("expenses_breakdown", "Répartition des Dépenses"),
+                                      empty_text=self.lang.get("expenses_no_data", "Aucune dépense enregistrée."))
 
     def open_vehicles_window(self):
         if self.vehicles_window is None or not tk.Toplevel.winfo_exists(self.vehicles_window):
-            self.vehicles_window = VehiclesWindow(self.parent, self.db_file, self.lang, self.reload_dashboard)
+            from ui.vehicles_window import VehiclesWindow
+            self.vehicles_window = VehiclesWindow(self.parent, self.db_file, self.lang)
         else:
             self.vehicles_window.focus()
 
     def open_drivers_window(self):
         if self.drivers_window is None or not tk.Toplevel.winfo_exists(self.drivers_window):
-            self.drivers_window = DriversWindow(self.parent, self.db_file, self.lang, self.reload_dashboard)
+            from ui.drivers_window import DriversWindow
+            self.drivers_window = DriversWindow(self.parent, self.db_file, self.lang)
         else:
             self.drivers_window.focus()
 
     def open_expenses_window(self):
         if self.expenses_window is None or not tk.Toplevel.winfo_exists(self.expenses_window):
-            self.expenses_window = ExpensesWindow(self.parent, self.db_file, self.lang, self.reload_dashboard)
+            from ui.expenses_window import ExpensesWindow
+            self.expenses_window = ExpensesWindow(self.parent, self.db_file, self.lang)
         else:
             self.expenses_window.focus()
 
     def open_missions_window(self):
         if self.missions_window is None or not tk.Toplevel.winfo_exists(self.missions_window):
-            self.missions_window = MissionsWindow(self.parent, self.db_file, self.lang, self.reload_dashboard)
+            from ui.missions_window import MissionsWindow
+            self.missions_window = MissionsWindow(self.parent, self.db_file, self.lang)
         else:
             self.missions_window.focus()
 
     def open_assignment_window(self):
         if self.assignment_window is None or not tk.Toplevel.winfo_exists(self.assignment_window):
-            self.assignment_window = AssignmentWindow(self.parent, self.db_file, self.lang, self.reload_dashboard)
+            from ui.assignment_window import AssignmentWindow
+            self.assignment_window = AssignmentWindow(self.parent, self.db_file, self.lang)
         else:
             self.assignment_window.focus()
 
     def show_about(self):
         if self.about_window is None or not tk.Toplevel.winfo_exists(self.about_window):
+            from ui.about_window import AboutWindow
             self.about_window = AboutWindow(self.parent, self.lang)
         else:
             self.about_window.focus()
 
+    def ask_report_filter(self, choose_formats=False):
+        # (ReportFilter, formats cochés) ; ReportFilter vaut None si annulé
+        from ui.report_filter_dialog import ReportFilterDialog
+        dialog = ReportFilterDialog(self.parent, self.db_file, self.lang, choose_formats)
+        dialog.grab_set()
+        self.parent.wait_window(dialog)
+        return dialog.result, dialog.formats
+
     def export_data(self):
-        export_type = tk.messagebox.askquestion(self.lang.get("export_title", "Exporter"), self.lang.get("export_ask_format", "Souhaitez-vous exporter au format Excel ou PDF ?"), icon='question')
-        if export_type == 'yes':
-            file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[(self.lang.get("excel_files", "Fichiers Excel"), "*.xlsx")])
-            if file_path:
-                vehicles = root_database.list_vehicles(self.db_file)
-                drivers
-                expenses = root_database.list_expenses(self.db_file)
-                missions = root_database.list_missions(self.db_file)
-                assignments_data = root_database.list_assignments(self.db_file)
-                export_to_excel(file_path, vehicles, drivers, expenses, missions, assignments_data, self.lang)
-                os.startfile(file_path) # Open the file after saving (Windows only)
-        elif export_type == 'no':
-            file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[(self.lang.get("pdf_files", "Fichiers PDF"), "*.pdf")])
-            if file_path:
-                vehicles = root_database.list_vehicles(self.db_file)
-                drivers = root_database.list_drivers(self.db_file)
-                expenses = root_database.list_expenses(self.db_file)
-                missions = root_database.list_missions(self.db_file)
-                assignments_data = root_database.list_assignments(self.db_file)
-                export_to_pdf(file_path, vehicles, drivers, expenses, missions, assignments_data, self.lang)
-                try:
-                    os.startfile(file_path) # Open the file after saving (Windows)
-                except AttributeError:
-                    import subprocess
-                    subprocess.call(['open', file_path]) # Open the file after saving (macOS)
-                except FileNotFoundError:
-                    tk.messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_pdf_viewer", "Impossible d'ouvrir le fichier PDF. Veuillez vérifier si un lecteur PDF est installé."))
+        report_filter, formats = self.ask_report_filter(choose_formats=True)
+        if report_filter is None:
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension="." + formats[0], filetypes=[(self.lang.get("pdf_files", "Fichiers PDF"), "*.pdf"), (self.lang.get("excel_files", "Fichiers Excel"), "*.xlsx"), (self.lang.get("csv_files", "Fichiers CSV"), "*.csv")])
+        if file_path:
+            # Un fichier par format, même nom de base
+            stem = os.path.splitext(file_path)[0]
+            self.run_export({fmt: f"{stem}.{fmt}" for fmt in formats}, report_filter)
 
     def print_data(self):
+        report_filter, formats = self.ask_report_filter()
+        if report_filter is None:
+            return
         file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[(self.lang.get("pdf_files", "Fichiers PDF"), "*.pdf")])
         if file_path:
-            vehicles = database.list_vehicles(self.db_file)
-            drivers = database.list_drivers(self.db_file)
-            expenses = database.list_expenses(self.db_file)
-            missions = database.list_missions(self.db_file)
-            assignments_data = database.list_assignments(self.db_file)
-            export_to_pdf(file_path, vehicles, drivers, expenses, missions, assignments_data, self.lang, for_print=True)
-            try:
-                os.startfile(file_path) # Open the file for printing (user can then choose to print)
-            except AttributeError:
-                import subprocess
-                subprocess.call(['open', file_path]) # Open the file for printing (macOS)
-            except FileNotFoundError:
-                tk.messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_pdf_viewer", "Impossible d'ouvrir le fichier PDF. Veuillez vérifier si un lecteur PDF est installé."))
+            self.run_export({"pdf": file_path}, report_filter) # Open the file for printing (user can then choose to print)
+
+    def run_export(self, outputs, report_filter):
+        # Instantané de la base puis un processus par format (voir ExportJob) ;
+        # la tâche qui attend les processus tourne hors du thread Tk
+        from reporting.export_job import ExportJob
+        from ui.export_progress import ExportProgressDialog
+        self.export_job = ExportJob(self.db_file, self.lang, outputs, report_filter)
+        dialog = ExportProgressDialog(self.parent, self.lang, on_cancel=self.export_job.cancel)
+        self.btn_export.config(state=tk.DISABLED)
+        self.btn_print.config(state=tk.DISABLED)
+        self.tasks.submit(self.export_job.run, progress=self.tasks.progress_callback(dialog.update_progress),
+                          on_success=lambda results: self.on_export_done(results, dialog),
+                          on_error=lambda error: self.on_export_failed(error, dialog))
+
+    def on_export_done(self, results, dialog):
+        self.export_job = None
+        dialog.destroy()
+        self.btn_export.config(state=tk.NORMAL)
+        self.btn_print.config(state=tk.NORMAL)
+        files = [path for paths in results.values() for path in paths]
+        if len(files) != 1:
+            tk.messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("export_files_created", "Fichiers créés :") + "\n" + "\n".join(files))
+            return
+        file_path = files[0]
+        try:
+            os.startfile(file_path) # Open the file after saving (Windows)
+        except AttributeError:
+            import subprocess
+            subprocess.call(['open', file_path]) # Open the file after saving (macOS)
+        except FileNotFoundError:
+            tk.messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_pdf_viewer", "Impossible d'ouvrir le fichier PDF. Veuillez vérifier si un lecteur PDF est installé."))
+
+    def on_export_failed(self, error, dialog):
+        from reporting.export_job import ExportCancelled
+        self.export_job = None
+        dialog.destroy()
+        self.btn_export.config(state=tk.NORMAL)
+        self.btn_print.config(state=tk.NORMAL)
+        if isinstance(error, ExportCancelled):
+            return
+        logger.error(f"Erreur lors de l'exportation : {error}")
+        tk.messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_failed", "Échec de l'exportation: ") + str(error))
 
     def backup_database(self):
         backup_path = filedialog.asksaveasfilename(defaultextension=".db", filetypes=[(self.lang.get("database_files", "Fichiers de base de données"), "*.db")])
@@ -335,5 +405,3 @@ class MainWindow(ttk.Frame):
             else:
                 tk.messagebox.showerror(self.lang.get("restore_error_title", "Erreur de restauration"), self.lang.get("restore_error_message", "Une erreur s'est produite lors de la restauration de la base de données."))
 
-    def reload_dashboard(self):
-        self.load_dashboard_data()
@@ -3,24 +3,43 @@ from tkinter import ttk, messagebox
 import db_utils as root_database
 from utils.validation_utils import validate_date
 from utils.date_utils import calculate_weekends
+from utils import holidays
 from datetime import datetime, timedelta
+from utils.excel_utils import import_xls_file
+from ui.import_progress import ImportProgressDialog
+import importing.pipeline as import_pipeline
+from ui.task_runner import TaskRunner
+from ui.paged_treeview import PagedTreeview
 
 class MissionsWindow(tk.Toplevel):
-    def __init__(self, parent, db_file, lang, reload_callback):
+    def __init__(self, parent, db_file, lang):
         tk.Toplevel.__init__(self, parent)
         self.title(lang.get("missions_title", "Gestion des Missions"))
         self.geometry("900x450")
         self.db_file = db_file
         self.lang = lang
-        self.reload_callback = reload_callback
+        self.tasks = TaskRunner(self)
 
-        self.drivers = root_database.list_drivers(self.db_file)
-        self.driver_dict = {f"{d[1]} {d[2]}": d[0] for d in self.drivers} # Name Surname : ID
+        self.drivers = []
+        self.driver_dict = {}
 
         self.create_widgets()
+        self.load_drivers()
         self.populate_treeview()
         self.create_import_export_print_buttons()
 
+    # La liste du menu déroulant est lue dans un thread de travail ; elle
+    # reste vide le temps du chargement
+    def load_drivers(self):
+        self.tasks.submit(root_database.list_drivers, self.db_file, key="drivers",
+                          on_success=self.set_drivers,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e)))
+
+    def set_drivers(self, drivers):
+        self.drivers = drivers
+        self.driver_dict = {f"{d[1]} {d[2]}": d[0] for d in drivers} # Name Surname : ID
+        self.driver_combo.config(values=list(self.driver_dict.keys()))
+
     def create_widgets(self):
         # --- Form Frame ---
         form_frame = ttk.LabelFrame(self, text=self.lang.get("mission_details", "Détails de la Mission"), padding=10)
@@ -135,7 +154,8 @@ class MissionsWindow(tk.Toplevel):
         tree_frame = ttk.Frame(self, padding=10)
         tree_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.tree = ttk.Treeview(tree_frame, columns=("id", "driver_name", "start_date", "end_date", "destination", "duration", "meals", "nights", "weekends"), show="headings")
+        self.list_view = PagedTreeview(tree_frame, ("id", "driver_name", "start_date", "end_date", "destination", "duration", "meals", "nights", "weekends"), self.tasks, format_row=self.format_row)
+        self.tree = self.list_view.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("driver_name", text=self.lang.get("driver", "Conducteur"))
         self.tree.heading("start_date", text=self.lang.get("start_date_short", "Début"))
@@ -148,26 +168,45 @@ class MissionsWindow(tk.Toplevel):
 
         for col in ["id", "driver_name", "start_date", "end_date", "destination", "duration", "meals", "nights", "weekends"]:
             self.tree.column(col, width=100, anchor="center")
-            self.tree.heading(col, command=lambda c=col: self.sort_treeview(c, False))
+            self.tree.heading(col, command=lambda c=col: self.list_view.sort_by(c))
 
         self.tree.bind('<<TreeviewSelect>>', self.populate_form)
-        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.list_view.grid(row=0, column=0, sticky="nsew")
 
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        search_frame = ttk.LabelFrame(self, text=self.lang.get("search", "Rechercher"), padding=5)
+        search_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.search_entry = ttk.Entry(search_frame)
+        self.search_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(search_frame, text=self.lang.get("button_search", "Rechercher"), command=self.search_missions).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         self.columnconfigure(1, weight=1)
         self.rowconfigure(0, weight=1)
 
     def populate_treeview(self, driver_id=None):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        missions = root_database.list_missions(self.db_file, driver_id)
-        for mission in missions:
-            driver = root_database.get_driver(self.db_file, mission[1])
-            driver_name = f"{driver[1]} {driver[2]}" if driver else self.lang.get("unknown", "Inconnu")
-            self.tree.insert("", tk.END, values=(mission[0], driver_name, mission[2], mission[3], mission[4], mission[5], mission[6], mission[7], mission[8]))
+        self.list_view.reload(lambda limit, offset, order_by, descending: root_database.list_missions_with_driver(self.db_file, driver_id, limit, offset, order_by, descending))
+
+    def format_row(self, mission):
+        driver_name = mission[1] if mission[1] is not None else self.lang.get("unknown", "Inconnu")
+        return (mission[0], driver_name) + tuple(mission[2:])
+
+    def import_missions(self):
+        workbook, error = import_xls_file()
+        if error:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), error)
+            return
+        dialog = ImportProgressDialog(self, self.lang)
+        self.tasks.submit(import_pipeline.import_missions, self.db_file, workbook,
+                          progress=self.tasks.progress_callback(dialog.update_progress),
+                          on_success=lambda report: self.on_import_done(dialog, report),
+                          on_error=lambda error: self.on_import_failed(dialog, error))
+
+    def on_import_done(self, dialog, report):
+        self.populate_treeview()
+        dialog.show_report(report)
+
+    def on_import_failed(self, dialog, error):
+        dialog.destroy()
+        messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_import_failed", "Échec de l'importation: ") + str(error))
 
     def populate_form(self, event):
         selected_item = self.tree.selection()
@@ -227,14 +266,17 @@ class MissionsWindow(tk.Toplevel):
             meals = int(meals_str) if meals_str else None
             nights = int(nights_str) if nights_str else None
             weekends = int(weekends_str) if weekends_str else 0
+        except ValueError:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Durée, nombre de repas ou nombre de nuitées invalides."))
+            return
 
+        try:
             root_database.add_mission(self.db_file, driver_id, start_date, end_date, destination, duration, meals, nights, weekends)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("mission_added", "Mission ajoutée avec succès."))
-        except ValueError:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Durée, nombre de repas ou nombre de nuitées invalides."))
+        except ValueError as e:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -266,17 +308,20 @@ class MissionsWindow(tk.Toplevel):
             meals = int(meals_str) if meals_str else None
             nights = int(nights_str) if nights_str else None
             weekends = int(weekends_str) if weekends_str else 0
+        except ValueError:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Durée, nombre de repas ou nombre de nuitées invalides."))
+            return
 
+        try:
             root_database.update_mission(self.db_file, self.selected_id, driver_id, start_date, end_date, destination, duration, meals, nights, weekends)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("mission_updated", "Mission mise à jour avec succès."))
             self.update_button.config(state=tk.DISABLED)
             self.delete_button.config(state=tk.DISABLED)
             self.selected_id = None
-        except ValueError:
-            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_number", "Durée, nombre de repas ou nombre de nuitées invalides."))
+        except ValueError as e:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
         except Exception as e:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -289,7 +334,6 @@ class MissionsWindow(tk.Toplevel):
             try:
                 root_database.delete_mission(self.db_file, self.selected_id)
                 self.populate_treeview()
-                self.reload_callback()
                 self.clear_form()
                 messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("mission_deleted", "Mission supprimée avec succès."))
                 self.update_button.config(state=tk.DISABLED)
@@ -311,27 +355,23 @@ class MissionsWindow(tk.Toplevel):
         self.delete_button.config(state=tk.DISABLED)
         self.selected_id = None
 
+    def search_missions(self):
+        query = self.search_entry.get()
+        if query:
+            self.list_view.reload(lambda limit, offset, order_by, descending: root_database.search_missions(self.db_file, query, None, limit, offset, order_by, descending))
+        else:
+            self.populate_treeview()
+
     def calculate_weekends(self):
         start_date_str = self.start_date_entry.get()
         end_date_str = self.end_date_entry.get()
         if validate_date(start_date_str) and validate_date(end_date_str):
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            weekends = calculate_weekends(start_date, end_date)
+            # Jours fériés en semaine comptés avec les week-ends (voir main.HOLIDAY_CALENDAR)
+            calendar = holidays.get_calendar()
+            weekends = calendar.count_days_off(start_date, end_date) if calendar else calculate_weekends(start_date, end_date)
             self.weekends_entry.delete(0, tk.END)
             self.weekends_entry.insert(0, str(weekends))
         else:
             messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_date_format", "Format de date invalide pour calculer les week-ends (AAAA-MM-JJ)."))
-
-    def sort_treeview(self, col, reverse):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        try:
-            if col == "duration" or col == "meals" or col == "nights" or col == "weekends":
-                data.sort(key=lambda item: int(item[0]) if item[0] else float('-inf'), reverse=reverse)
-            else:
-                data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        except ValueError:
-            data.sort(key=lambda item: item[0].lower(), reverse=reverse)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
\ No newline at end of file
@@ -0,0 +1,83 @@
+import tkinter as tk
+from tkinter import ttk
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 200
+# Fraction de défilement à partir de laquelle la page suivante est demandée
+PREFETCH_THRESHOLD = 0.9
+
+class PagedTreeview(ttk.Frame):
+    """Treeview alimenté page par page (LIMIT/OFFSET) au fil du défilement.
+
+    fetch_page(limit, offset, order_by, descending) est exécutée dans un
+    thread de travail via tasks (TaskRunner) et doit renvoyer au plus limit
+    lignes, triées par la base. format_row convertit chaque ligne en
+    valeurs affichées, dans le thread Tk.
+    """
+    def __init__(self, parent, columns, tasks, page_size=PAGE_SIZE, format_row=None):
+        ttk.Frame.__init__(self, parent)
+        self.tasks = tasks
+        self.page_size = page_size
+        self.format_row = format_row or tuple
+        self.fetch_page = None
+        self.order_by = None
+        self.descending = False
+        self.loaded = 0
+        self.exhausted = True
+        self.loading = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar_y = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+    def reload(self, fetch_page=None):
+        """Vide la liste et recharge la première page (avec une nouvelle source si fournie)."""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.loaded = 0
+        self.exhausted = False
+        self.loading = False
+        self.load_next_page(clear=True)
+
+    def sort_by(self, column):
+        """Trie sur column (ordre inversé si elle est déjà la colonne de tri) et recharge la première page."""
+        if column == self.order_by:
+            self.descending = not self.descending
+        else:
+            self.order_by = column
+            self.descending = False
+        self.reload()
+
+    def load_next_page(self, clear=False):
+        if self.fetch_page is None or self.loading or self.exhausted:
+            return
+        self.loading = True
+        # Même clé : un rechargement remplace une page encore en cours de lecture
+        self.tasks.submit(self.fetch_page, self.page_size, self.loaded, self.order_by, self.descending,
+                          on_success=lambda rows: self.on_page_loaded(rows, clear),
+                          on_error=self.on_page_failed, key="page")
+
+    def on_page_loaded(self, rows, clear):
+        if clear:
+            self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", tk.END, values=self.format_row(row))
+        self.loaded += len(rows)
+        self.exhausted = len(rows) < self.page_size
+        self.loading = False
+        # Si la page ne remplit pas la zone visible, on_scroll demandera la suivante
+
+    def on_page_failed(self, error):
+        self.loading = False
+        logger.error(f"Erreur lors du chargement d'une page : {error}")
+
+    def on_scroll(self, first, last):
+        self.scrollbar_y.set(first, last)
+        if float(last) >= PREFETCH_THRESHOLD:
+            self.load_next_page()
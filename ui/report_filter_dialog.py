@@ -0,0 +1,126 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, timedelta
+import db_utils as root_database
+from reporting.queries import ReportFilter
+from ui.task_runner import TaskRunner
+from utils.validation_utils import validate_date
+
+def _read_choices(db_file):
+    # Thread de travail : véhicules, conducteurs et types de dépenses proposés
+    return (root_database.list_vehicles(db_file),
+            root_database.list_drivers(db_file),
+            [row[0] for row in root_database.get_expenses_by_type(db_file)])
+
+class ReportFilterDialog(tk.Toplevel):
+    """Choix de la période, des véhicules, des conducteurs et des types de
+    dépenses d'un rapport. Une liste sans sélection ne filtre pas.
+
+    Après fermeture, self.result vaut le ReportFilter choisi, ou None si
+    l'utilisateur a annulé. Avec choose_formats, self.formats contient en
+    plus les formats cochés (clés de reporting.export_job.EXPORTERS).
+    """
+    def __init__(self, parent, db_file, lang, choose_formats=False):
+        tk.Toplevel.__init__(self, parent)
+        self.title(lang.get("report_filter_title", "Contenu du rapport"))
+        self.geometry("700x420")
+        self.db_file = db_file
+        self.lang = lang
+        self.result = None
+        self.formats = []
+        self.choose_formats = choose_formats
+        self.transient(parent)
+        self.tasks = TaskRunner(self)
+
+        self.vehicles = []
+        self.drivers = []
+        self.expense_types = []
+
+        self.create_widgets()
+        self.tasks.submit(_read_choices, self.db_file,
+                          on_success=self.set_choices,
+                          on_error=lambda e: messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e), parent=self))
+
+    def set_choices(self, choices):
+        self.vehicles, self.drivers, self.expense_types = choices
+        self.fill_list(self.vehicle_list, [f"{v[1]} ({v[2]})" for v in self.vehicles])
+        self.fill_list(self.driver_list, [f"{d[1]} {d[2]}" for d in self.drivers])
+        self.fill_list(self.type_list, self.expense_types)
+
+    def create_widgets(self):
+        period_frame = ttk.LabelFrame(self, text=self.lang.get("report_filter_period", "Période (AAAA-MM-JJ, vide = tout)"), padding=10)
+        period_frame.pack(padx=10, pady=5, fill="x")
+        ttk.Label(period_frame, text=self.lang.get("report_filter_from", "Du :")).pack(side="left", padx=5)
+        self.start_entry = ttk.Entry(period_frame, width=12)
+        self.start_entry.pack(side="left", padx=5)
+        ttk.Label(period_frame, text=self.lang.get("report_filter_to", "Au :")).pack(side="left", padx=5)
+        self.end_entry = ttk.Entry(period_frame, width=12)
+        self.end_entry.pack(side="left", padx=5)
+        ttk.Button(period_frame, text=self.lang.get("button_previous_month", "Mois précédent"), command=self.set_previous_month).pack(side="left", padx=5)
+
+        lists_frame = ttk.Frame(self)
+        lists_frame.pack(padx=10, pady=5, fill="both", expand=True)
+        self.vehicle_list = self.create_list(lists_frame, 0, self.lang.get("vehicles_title", "Véhicules"))
+        self.driver_list = self.create_list(lists_frame, 1, self.lang.get("drivers_title", "Conducteurs"))
+        self.type_list = self.create_list(lists_frame, 2, self.lang.get("report_filter_types", "Types de dépenses"))
+
+        if self.choose_formats:
+            formats_frame = ttk.LabelFrame(self, text=self.lang.get("export_formats", "Formats"), padding=5)
+            formats_frame.pack(padx=10, pady=5, fill="x")
+            self.format_vars = {}
+            for fmt, label in (("pdf", "PDF"), ("xlsx", "Excel"), ("csv", "CSV")):
+                self.format_vars[fmt] = tk.BooleanVar(value=(fmt == "pdf"))
+                ttk.Checkbutton(formats_frame, text=label, variable=self.format_vars[fmt]).pack(side="left", padx=10)
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(padx=10, pady=5, fill="x")
+        ttk.Button(button_frame, text=self.lang.get("button_cancel", "Annuler"), command=self.destroy).pack(side="right", padx=5)
+        ttk.Button(button_frame, text=self.lang.get("button_ok", "Valider"), command=self.confirm).pack(side="right", padx=5)
+
+    def create_list(self, parent, column, title):
+        frame = ttk.LabelFrame(parent, text=title, padding=5)
+        frame.grid(row=0, column=column, padx=5, sticky="nsew")
+        parent.columnconfigure(column, weight=1)
+        parent.rowconfigure(0, weight=1)
+        listbox = tk.Listbox(frame, selectmode=tk.MULTIPLE, exportselection=False)
+        listbox.pack(side="left", fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=listbox.yview)
+        scrollbar.pack(side="right", fill="y")
+        listbox.configure(yscrollcommand=scrollbar.set)
+        return listbox
+
+    def fill_list(self, listbox, values):
+        listbox.delete(0, tk.END)
+        for value in values:
+            listbox.insert(tk.END, value)
+
+    def set_previous_month(self):
+        last_day = date.today().replace(day=1) - timedelta(days=1)
+        self.start_entry.delete(0, tk.END)
+        self.start_entry.insert(0, last_day.replace(day=1).isoformat())
+        self.end_entry.delete(0, tk.END)
+        self.end_entry.insert(0, last_day.isoformat())
+
+    def confirm(self):
+        start_date = self.start_entry.get().strip() or None
+        end_date = self.end_entry.get().strip() or None
+        for value in (start_date, end_date):
+            if value and not validate_date(value):
+                messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_invalid_date_format", "Format de date invalide (AAAA-MM-JJ)."), parent=self)
+                return
+        if start_date and end_date and start_date > end_date:
+            messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_report_period", "La date de début doit précéder la date de fin."), parent=self)
+            return
+        if self.choose_formats:
+            self.formats = [fmt for fmt, var in self.format_vars.items() if var.get()]
+            if not self.formats:
+                messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_export_no_format", "Choisissez au moins un format."), parent=self)
+                return
+
+        self.result = ReportFilter(
+            start_date=start_date,
+            end_date=end_date,
+            vehicle_ids=[self.vehicles[i][0] for i in self.vehicle_list.curselection()],
+            driver_ids=[self.drivers[i][0] for i in self.driver_list.curselection()],
+            expense_types=[self.expense_types[i] for i in self.type_list.curselection()])
+        self.destroy()
@@ -0,0 +1,120 @@
+import queue
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Les appels à db_utils (et les exports) tournent dans ce pool pour ne pas
+# geler la boucle Tk. Tk n'étant pas thread-safe, les résultats reviennent
+# au thread principal par un sondage périodique via widget.after().
+MAX_WORKERS = 4
+POLL_INTERVAL_MS = 50
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fleet-worker")
+    return _executor
+
+def shutdown(wait=False):
+    """Arrête le pool ; les tâches pas encore commencées sont abandonnées.
+
+    Avec wait, attend la fin des tâches en cours (et de leurs threads).
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+
+class TaskCancelled(Exception):
+    """Levée dans le thread de travail quand la fenêtre propriétaire est fermée."""
+
+class TaskRunner:
+    def __init__(self, widget):
+        self.widget = widget
+        self.cancelled = False
+        self._pending = {}  # clé -> (future, on_success, on_error)
+        self._callbacks = queue.Queue()
+        self._poll_id = None
+        self._next_key = 0
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    def submit(self, func, *args, on_success=None, on_error=None, key=None, **kwargs):
+        """Exécute func(*args, **kwargs) dans le pool.
+
+        on_success(résultat) ou on_error(exception) sont appelés dans le thread
+        Tk. Une nouvelle tâche soumise avec la même clé remplace la précédente,
+        dont le résultat est alors ignoré.
+        """
+        if self.cancelled:
+            return None
+        if key is None:
+            key = self._next_key
+            self._next_key += 1
+        previous = self._pending.pop(key, None)
+        if previous is not None:
+            previous[0].cancel()
+        future = get_executor().submit(func, *args, **kwargs)
+        self._pending[key] = (future, on_success, on_error)
+        self._schedule_poll()
+        return future
+
+    def progress_callback(self, callback):
+        """Renvoie une fonction appelable depuis le thread de travail.
+
+        Chaque appel est relayé à callback dans le thread Tk. Si la fenêtre a
+        été fermée entre-temps, l'appel lève TaskCancelled pour interrompre
+        la tâche au prochain point de contrôle.
+        """
+        def relay(*args):
+            if self.cancelled:
+                raise TaskCancelled()
+            self._callbacks.put((callback, args))
+        return relay
+
+    def cancel_all(self):
+        self.cancelled = True
+        for future, _, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _on_destroy(self, event):
+        # <Destroy> est aussi reçu pour chaque widget enfant
+        if event.widget is self.widget:
+            self.cancel_all()
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self.cancelled:
+            self._poll_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        # Relever les tâches terminées avant de vider la file : leurs derniers
+        # appels de progression sont ainsi traités avant on_success.
+        done = [key for key, (future, _, _) in self._pending.items() if future.done()]
+        while not self._callbacks.empty():
+            callback, args = self._callbacks.get_nowait()
+            callback(*args)
+
+        for key in done:
+            future, on_success, on_error = self._pending.pop(key)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is None:
+                if on_success:
+                    on_success(future.result())
+            elif isinstance(error, TaskCancelled):
+                continue
+            elif on_error:
+                on_error(error)
+            else:
+                logger.error(f"Erreur dans une tâche d'arrière-plan : {error}")
+
+        if self._pending or not self._callbacks.empty():
+            self._schedule_poll()
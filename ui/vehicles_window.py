@@ -3,15 +3,17 @@ from tkinter import ttk, messagebox
 import db_utils as root_database
 from utils.validation_utils import validate_date
 from datetime import datetime
+from ui.task_runner import TaskRunner
+from ui.paged_treeview import PagedTreeview
 
 class VehiclesWindow(tk.Toplevel):
-    def __init__(self, parent, db_file, lang, reload_callback):
+    def __init__(self, parent, db_file, lang):
         tk.Toplevel.__init__(self, parent)
         self.title(lang.get("vehicles_title", "Gestion des Véhicules"))
         self.geometry("900x450")
         self.db_file = db_file
         self.lang = lang
-        self.reload_callback = reload_callback
+        self.tasks = TaskRunner(self)
 
         self.create_widgets()
         self.populate_treeview()
@@ -60,7 +62,8 @@ class VehiclesWindow(tk.Toplevel):
         tree_frame = ttk.Frame(self, padding=10)
         tree_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.tree = ttk.Treeview(tree_frame, columns=("id", "registration", "make", "model", "year", "revision_date", "control_date"), show="headings")
+        self.list_view = PagedTreeview(tree_frame, ("id", "registration", "make", "model", "year", "revision_date", "control_date"), self.tasks)
+        self.tree = self.list_view.tree
         self.tree.heading("id", text="ID")
         self.tree.heading("registration", text=self.lang.get("registration", "Immatriculation"))
         self.tree.heading("make", text=self.lang.get("make", "Marque"))
@@ -71,14 +74,10 @@ class VehiclesWindow(tk.Toplevel):
 
         for col in ["id", "registration", "make", "model", "year", "revision_date", "control_date"]:
             self.tree.column(col, width=100, anchor="center")
-            self.tree.heading(col, command=lambda c=col: self.sort_treeview(c, False))
+            self.tree.heading(col, command=lambda c=col: self.list_view.sort_by(c))
 
         self.tree.bind('<<TreeviewSelect>>', self.populate_form)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.list_view.grid(row=0, column=0, sticky="nsew")
 
         search_frame = ttk.LabelFrame(self, text=self.lang.get("search", "Rechercher"), padding=5)
         search_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
@@ -90,11 +89,7 @@ class VehiclesWindow(tk.Toplevel):
         self.rowconfigure(0, weight=1)
 
     def populate_treeview(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        vehicles = root_database.list_vehicles(self.db_file)
-        for vehicle in vehicles:
-            self.tree.insert("", tk.END, values=vehicle)
+        self.list_view.reload(lambda limit, offset, order_by, descending: root_database.list_vehicles(self.db_file, limit, offset, order_by, descending))
 
     def populate_form(self, event):
         selected_item = self.tree.selection()
@@ -147,7 +142,6 @@ class VehiclesWindow(tk.Toplevel):
         try:
             root_database.add_vehicle(self.db_file, registration, make, model, year_str if year_str else None, revision_date if revision_date else None, control_date if control_date else None)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("vehicle_added", "Véhicule ajouté avec succès."))
         except ValueError as e:
@@ -186,7 +180,6 @@ class VehiclesWindow(tk.Toplevel):
         try:
             root_database.update_vehicle(self.db_file, self.selected_id, registration, make, model, year_str if year_str else None, revision_date if revision_date else None, control_date if control_date else None)
             self.populate_treeview()
-            self.reload_callback()
             self.clear_form()
             messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("vehicle_updated", "Véhicule mis à jour avec succès."))
             self.update_button.config(state=tk.DISABLED)
@@ -206,12 +199,13 @@ class VehiclesWindow(tk.Toplevel):
             try:
                 root_database.delete_vehicle(self.db_file, self.selected_id)
                 self.populate_treeview()
-                self.reload_callback()
                 self.clear_form()
                 messagebox.showinfo(self.lang.get("success_title", "Succès"), self.lang.get("vehicle_deleted", "Véhicule supprimé avec succès."))
                 self.update_button.config(state=tk.DISABLED)
                 self.delete_button.config(state=tk.DISABLED)
                 self.selected_id = None
+            except ValueError as e:
+                messagebox.showerror(self.lang.get("error_title", "Erreur"), str(e))
             except Exception as e:
                 messagebox.showerror(self.lang.get("error_title", "Erreur"), self.lang.get("error_database_operation", "Erreur lors de l'opération sur la base de données:") + str(e))
 
@@ -229,22 +223,6 @@ class VehiclesWindow(tk.Toplevel):
     def search_vehicles(self):
         query = self.search_entry.get()
         if query:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            vehicles = database.search_vehicles(self.db_file, query)
-            for vehicle in vehicles:
-                self.tree.insert("", tk.END, values=vehicle)
+            self.list_view.reload(lambda limit, offset, order_by, descending: root_database.search_vehicles(self.db_file, query, limit, offset, order_by, descending))
         else:
             self.populate_treeview()
-
-    def sort_treeview(self, col, reverse):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children('')]
-        try:
-            # Try to sort as numbers if possible
-            data.sort(key=lambda item: float(item[0]), reverse=reverse)
-        except ValueError:
-            # Otherwise sort as strings
-            data.sort(key=lambda item: item[0], reverse=reverse)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
\ No newline at end of file
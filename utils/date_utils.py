@@ -1,14 +1,42 @@
-from datetime import date, timedelta
+from datetime import date
+
+def _weekend_days_before(day_index):
+    # Jours de week-end parmi les jours d'index [0, day_index) ; l'index 0
+    # (ordinal 1, 01/01/0001) est un lundi, donc l'index % 7 est le weekday().
+    full_weeks, remainder = divmod(day_index, 7)
+    return 2 * full_weeks + max(0, remainder - 5)
 
 def calculate_weekends(start_date, end_date):
+    """Nombre de samedis et dimanches entre deux dates, bornes incluses (en O(1))."""
+    if not isinstance(start_date, date) or not isinstance(end_date, date):
+        raise TypeError("Les arguments doivent être des objets datetime.date")
+    if start_date > end_date:
+        return 0
+    return _weekend_days_before(end_date.toordinal()) - _weekend_days_before(start_date.toordinal() - 1)
+
+def calculate_business_days(start_date, end_date):
+    """Nombre de jours du lundi au vendredi entre deux dates, bornes incluses."""
     if not isinstance(start_date, date) or not isinstance(end_date, date):
         raise TypeError("Les arguments doivent être des objets datetime.date")
     if start_date > end_date:
         return 0
-    weekends = 0
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() >= 5:  # Saturday (5) or Sunday (6)
-            weekends += 1
-        current_date += timedelta(days=1)
-    return weekends
\ No newline at end of file
+    return (end_date - start_date).days + 1 - calculate_weekends(start_date, end_date)
+
+def mission_day_counts(start_dates, end_dates, holidays=None):
+    """Durée, nuitées et jours de week-end d'un lot de missions, en une passe NumPy.
+
+    start_dates et end_dates sont des séquences de dates AAAA-MM-JJ (texte ou
+    datetime64). Renvoie trois tableaux d'entiers : durée en jours (bornes
+    incluses), nuitées (durée - 1) et jours non ouvrés (samedis, dimanches,
+    et jours de holidays tombant en semaine). Une mission dont la fin
+    précède le début compte 0 partout.
+    """
+    import numpy as np
+    starts = np.asarray(start_dates, dtype="datetime64[D]")
+    ends = np.asarray(end_dates, dtype="datetime64[D]")
+    valid = ends >= starts
+    # Fin exclusive pour busday_count ; les missions invalides comptent 0 jour
+    stops = np.where(valid, ends + np.timedelta64(1, "D"), starts)
+    duration = (stops - starts).astype(np.int64)
+    business_days = np.busday_count(starts, stops, holidays=[] if holidays is None else holidays)
+    return duration, np.maximum(duration - 1, 0), duration - business_days
@@ -14,7 +14,9 @@ def import_xls_file():
     if not file_path.lower().endswith('.xls'):
         return None, "Selected file is not an .xls file"
     try:
-        workbook = xlrd.open_workbook(file_path)
+        # on_demand : seules les feuilles réellement lues sont chargées ; une
+        # feuille lue est chargée entièrement en mémoire par xlrd
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
         return workbook, None
     except Exception as e:
         return None, f"Failed to open Excel file: {str(e)}"
@@ -0,0 +1,157 @@
+import os
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from utils.date_utils import calculate_weekends
+
+logger = logging.getLogger(__name__)
+
+# Un fichier JSON par pays ou région (code = nom du fichier) :
+#  - "fixed" : jours fériés à date fixe, "MM-JJ"
+#  - "easter" : décalage en jours depuis le dimanche de Pâques
+#  - "dates" : jours ponctuels "AAAA-MM-JJ" (fêtes au calendrier lunaire...)
+#  - "extends" : code d'un autre fichier dont les jours sont repris
+HOLIDAY_DATA_DIR = os.path.join(os.path.dirname(__file__), "holiday_data")
+
+def easter_sunday(year):
+    # Calcul grégorien anonyme (Meeus/Jones/Butcher)
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+class HolidayCalendar:
+    """Jours fériés d'un pays ou d'une région.
+
+    Les jours fériés de chaque année sont calculés une fois, puis réunis en
+    tableaux triés d'ordinaux (tous les jours fériés, et ceux tombant en
+    semaine) : compter les jours fériés d'une période revient à deux
+    recherches dichotomiques.
+    """
+    def __init__(self, code, name, fixed, easter, dates):
+        self.code = code
+        self.name = name
+        self.fixed = dict(fixed)      # (mois, jour) -> libellé
+        self.easter = dict(easter)    # décalage depuis Pâques -> libellé
+        self.dates = dict(dates)      # date -> libellé
+        self._labels = {}             # ordinal -> libellé, années préparées
+        self._ordinals = []           # ordinaux triés de tous les jours fériés
+        self._weekday_ordinals = []   # ordinaux triés des jours fériés en semaine
+        self._years = None            # (première, dernière) année préparée
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, code, directory=HOLIDAY_DATA_DIR):
+        filepath = os.path.join(directory, f"{code}.json")
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Calendrier de jours fériés inconnu : {code}")
+        fixed, easter, dates = {}, {}, {}
+        if data.get("extends"):
+            parent = cls.load(data["extends"], directory)
+            fixed, easter, dates = parent.fixed, parent.easter, parent.dates
+        for key, label in data.get("fixed", {}).items():
+            month, day = key.split("-")
+            fixed[(int(month), int(day))] = label
+        for offset, label in data.get("easter", {}).items():
+            easter[int(offset)] = label
+        for key, label in data.get("dates", {}).items():
+            dates[date.fromisoformat(key)] = label
+        return cls(code, data.get("name", code), fixed, easter, dates)
+
+    def holidays_for_year(self, year):
+        """[(date, libellé)] de l'année, triés par date."""
+        days = {}
+        for (month, day), label in self.fixed.items():
+            days[date(year, month, day)] = label
+        easter = easter_sunday(year)
+        for offset, label in self.easter.items():
+            days[easter + timedelta(days=offset)] = label
+        for day, label in self.dates.items():
+            if day.year == year:
+                days[day] = label
+        return sorted(days.items())
+
+    def _prepare(self, first_year, last_year):
+        # Étend les tableaux triés aux années demandées ; rien à faire si elles
+        # sont déjà couvertes
+        if self._years and self._years[0] <= first_year and last_year <= self._years[1]:
+            return
+        with self._lock:
+            if self._years:
+                first_year = min(first_year, self._years[0])
+                last_year = max(last_year, self._years[1])
+            labels = {}
+            for year in range(first_year, last_year + 1):
+                for day, label in self.holidays_for_year(year):
+                    labels[day.toordinal()] = label
+            ordinals = sorted(labels)
+            # Index 0 (ordinal 1) = lundi : ordinal % 7 vaut 6 le samedi, 0 le dimanche
+            weekday_ordinals = [ordinal for ordinal in ordinals if ordinal % 7 not in (0, 6)]
+            self._labels = labels
+            self._ordinals, self._weekday_ordinals = ordinals, weekday_ordinals
+            self._years = (first_year, last_year)
+
+    def label(self, day):
+        """Libellé du jour férié, ou None si day n'est pas férié."""
+        self._prepare(day.year, day.year)
+        return self._labels.get(day.toordinal())
+
+    def is_holiday(self, day):
+        return self.label(day) is not None
+
+    def holidays_between(self, start_date, end_date, weekdays_only=False):
+        """Jours fériés de la période, bornes incluses, triés."""
+        if start_date > end_date:
+            return []
+        self._prepare(start_date.year, end_date.year)
+        ordinals = self._weekday_ordinals if weekdays_only else self._ordinals
+        low = bisect_left(ordinals, start_date.toordinal())
+        high = bisect_right(ordinals, end_date.toordinal())
+        return [date.fromordinal(ordinal) for ordinal in ordinals[low:high]]
+
+    def count_holidays(self, start_date, end_date, weekdays_only=False):
+        """Nombre de jours fériés de la période, bornes incluses."""
+        if start_date > end_date:
+            return 0
+        self._prepare(start_date.year, end_date.year)
+        ordinals = self._weekday_ordinals if weekdays_only else self._ordinals
+        return bisect_right(ordinals, end_date.toordinal()) - bisect_left(ordinals, start_date.toordinal())
+
+    def count_days_off(self, start_date, end_date):
+        """Samedis, dimanches et jours fériés en semaine de la période, bornes incluses."""
+        return calculate_weekends(start_date, end_date) + self.count_holidays(start_date, end_date, weekdays_only=True)
+
+def available_calendars(directory=HOLIDAY_DATA_DIR):
+    return sorted(filename[:-5] for filename in os.listdir(directory) if filename.endswith(".json"))
+
+_calendars = {}
+_active_code = None
+
+def configure(code):
+    """Choisit le calendrier utilisé par défaut (None : aucun jour férié)."""
+    global _active_code
+    if code is not None:
+        get_calendar(code)  # erreur immédiate si le fichier n'existe pas
+    _active_code = code
+
+def get_calendar(code=None):
+    """Calendrier demandé (chargé une seule fois), ou celui de configure()."""
+    code = code or _active_code
+    if code is None:
+        return None
+    if code not in _calendars:
+        _calendars[code] = HolidayCalendar.load(code)
+        logger.info(f"Calendrier de jours fériés chargé : {code}")
+    return _calendars[code]
@@ -0,0 +1,57 @@
+import builtins
+import sys
+import time
+
+# Imports plus rapides que ce seuil omis du rapport (en secondes)
+REPORT_THRESHOLD = 0.001
+
+class StartupProfiler:
+    """Mesure le démarrage de l'application (main.py --profile-startup).
+
+    install() chronomètre chaque premier import de module (durée cumulée,
+    sous-modules compris) ; mark() note les étapes du démarrage ; report()
+    affiche les deux sur la sortie d'erreur.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = []  # [profondeur, module, durée]
+        self.phases = []   # (étape, secondes depuis le lancement)
+        self._depth = 0
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        entry = [self._depth, name, 0.0]
+        self.imports.append(entry)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            entry[2] = time.perf_counter() - start
+            self._depth -= 1
+
+    def mark(self, phase):
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        print("=== Démarrage : étapes (secondes depuis le lancement) ===", file=stream)
+        for phase, elapsed in self.phases:
+            print(f"{elapsed:8.3f}  {phase}", file=stream)
+        print("=== Imports (durée cumulée, sous-modules compris) ===", file=stream)
+        for depth, name, elapsed in self.imports:
+            if elapsed >= REPORT_THRESHOLD:
+                print(f"{elapsed:8.3f}  {'  ' * (depth - 1)}{name}", file=stream)
+        top_level = sum(elapsed for depth, name, elapsed in self.imports if depth == 1)
+        print(f"{top_level:8.3f}  total des imports", file=stream)